@@ -0,0 +1,167 @@
+"""
+K8s Embedding Backends - Pluggable embedding sources for GraniteEmbeddings
+
+Backends:
+- llamastack: Granite via Llama Stack inference API (default)
+- hashing:    Local hashed character n-gram vectorizer (NumPy only, no
+              model download, no network). Used as a degraded mode when
+              Llama Stack is unavailable and as a zero-network baseline.
+"""
+
+import logging
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+from llama_stack_client import LlamaStackClient
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("llamastack", "hashing")
+
+
+class EmbeddingBackendError(Exception):
+    """Raised when a backend cannot embed a batch"""
+
+
+class EmbeddingBackend:
+    """
+    Base class for embedding backends
+    Subclasses return one vector per input text or raise EmbeddingBackendError
+    """
+
+    name = "base"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class LlamaStackEmbeddingBackend(EmbeddingBackend):
+    """
+    Granite embeddings served by Llama Stack
+    """
+
+    name = "llamastack"
+
+    def __init__(
+        self,
+        llama_stack_url: str,
+        embedding_model: str = "granite-embedding-125m",
+        batch_size: int = 32
+    ):
+        """
+        Args:
+            llama_stack_url: URL to Llama Stack
+            embedding_model: Embedding model ID
+            batch_size: Texts sent per embeddings call
+        """
+        self.client = LlamaStackClient(base_url=llama_stack_url)
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        embeddings = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            try:
+                # Use Llama Stack's embedding API (one call per batch)
+                response = self.client.inference.embeddings(
+                    model_id=self.embedding_model,
+                    contents=batch
+                )
+            except Exception as e:
+                raise EmbeddingBackendError(f"Llama Stack embedding error: {e}") from e
+
+            returned = getattr(response, 'embeddings', None) or []
+            if len(returned) != len(batch):
+                raise EmbeddingBackendError(
+                    f"Expected {len(batch)} embeddings, got {len(returned)} "
+                    f"(first text: {batch[0][:100]})"
+                )
+            embeddings.extend(returned)
+
+        return embeddings
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Hashed character n-gram vectorizer
+
+    Each byte n-gram of the lowercased, whitespace-collapsed text is hashed
+    (CRC32, stable across processes) into one of `dimension` buckets with a
+    hash-derived sign. Counts are log-scaled and the vector L2-normalized,
+    so FAISS L2 distance behaves like cosine similarity. Log lines sharing
+    error codes, pod names and messages land close together.
+    """
+
+    name = "hashing"
+
+    def __init__(
+        self,
+        dimension: int = 384,
+        ngram_range: Tuple[int, int] = (3, 5),
+        max_chars: int = 20000
+    ):
+        """
+        Args:
+            dimension: Output vector size
+            ngram_range: Smallest and largest n-gram length (bytes)
+            max_chars: Only the first max_chars characters are vectorized
+        """
+        self.dimension = dimension
+        self.ngram_range = ngram_range
+        self.max_chars = max_chars
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(text).tolist() for text in texts]
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """Vectorize a single text (float32, unit length unless empty)"""
+        text = " ".join(text.lower().split())[:self.max_chars]
+        data = f" {text} ".encode("utf-8")
+
+        hashes = [
+            zlib.crc32(data[i:i + n])
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1)
+            for i in range(len(data) - n + 1)
+        ]
+        if not hashes:
+            return np.zeros(self.dimension, dtype=np.float32)
+
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        buckets = hashes % self.dimension
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+
+        vec = np.bincount(buckets, weights=signs, minlength=self.dimension)
+        vec = np.sign(vec) * np.log1p(np.abs(vec))
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec.astype(np.float32)
+
+
+def create_embedding_backend(
+    name: str,
+    llama_stack_url: str = None,
+    embedding_model: str = "granite-embedding-125m",
+    dimension: int = 384,
+    batch_size: int = 32
+) -> EmbeddingBackend:
+    """
+    Factory for embedding backends
+
+    Args:
+        name: One of EMBEDDING_BACKENDS
+        llama_stack_url: Llama Stack URL (llamastack backend only)
+        embedding_model: Llama Stack embedding model ID
+        dimension: Vector size (hashing backend only)
+        batch_size: Texts per embeddings call (llamastack backend only)
+
+    Returns:
+        EmbeddingBackend instance
+    """
+    if name == "llamastack":
+        return LlamaStackEmbeddingBackend(llama_stack_url, embedding_model, batch_size=batch_size)
+    if name == "hashing":
+        return HashingEmbeddingBackend(dimension=dimension)
+    raise ValueError(f"Unknown embedding backend '{name}', expected one of {EMBEDDING_BACKENDS}")
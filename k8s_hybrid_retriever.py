@@ -4,22 +4,34 @@ Based on: GenerativeAIExamples/community/log_analysis_multi_agent_rag/multiagent
 
 Key Features:
 - In-memory FAISS vector store (no persistent DB)
+- Selectable FAISS index type (flat / HNSW / SQ8 / IVF-PQ, auto by corpus size)
 - BM25 + FAISS with RRF via LangChain's EnsembleRetriever
 - 20K character chunks with 50% overlap (NVIDIA's proven settings)
 - Fresh logs fetched on-demand from OpenShift
 - Uses Granite 125M embeddings (self-hosted via Llama Stack)
+- Offline hashing embeddings as degraded mode / zero-network baseline
+- Chunks with well-known failure signatures pinned to the top of results
 """
 
 import os
 import logging
 from typing import List, Optional
+import numpy as np
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from langchain.retrievers import EnsembleRetriever
 from langchain_community.retrievers import BM25Retriever
 from langchain_community.vectorstores.faiss import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain.embeddings.base import Embeddings
-from llama_stack_client import LlamaStackClient
+from k8s_vector_index import build_faiss_index
+from k8s_embedding_backends import (
+    EmbeddingBackend,
+    EmbeddingBackendError,
+    create_embedding_backend
+)
+from v7_cache import fingerprint_text, get_retrieval_cache, normalize_query
+from v7_failure_signatures import chunk_signatures, scan_signatures, select_pinned_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -28,37 +40,78 @@ class GraniteEmbeddings(Embeddings):
     """
     Embeddings wrapper for Granite 125M via Llama Stack
     (Replaces NVIDIA embeddings with our self-hosted model)
+    
+    The embedding source is a pluggable EmbeddingBackend. If the primary
+    backend fails while embedding documents, the whole batch is re-embedded
+    with the fallback backend (local hashing by default) and queries use
+    the same backend afterwards, so documents and queries share one space.
     """
     
-    def __init__(self, llama_stack_url: str, embedding_model: str = "granite-embedding-125m"):
-        self.client = LlamaStackClient(base_url=llama_stack_url)
+    def __init__(
+        self,
+        llama_stack_url: str,
+        embedding_model: str = "granite-embedding-125m",
+        backend: Optional[EmbeddingBackend] = None,
+        fallback_backend: Optional[EmbeddingBackend] = None
+    ):
+        """
+        Args:
+            llama_stack_url: URL to Llama Stack (llamastack backend)
+            embedding_model: Llama Stack embedding model ID
+            backend: Primary backend (default: EMBEDDING_BACKEND env, then llamastack)
+            fallback_backend: Degraded-mode backend (default: EMBEDDING_FALLBACK
+                              env, then hashing; "none" keeps zero vectors)
+        """
         self.embedding_model = embedding_model
         
+        if backend is None:
+            backend = create_embedding_backend(
+                os.getenv("EMBEDDING_BACKEND", "llamastack"),
+                llama_stack_url=llama_stack_url,
+                embedding_model=embedding_model
+            )
+        if fallback_backend is None:
+            fallback_name = os.getenv("EMBEDDING_FALLBACK", "hashing")
+            if fallback_name != "none" and fallback_name != backend.name:
+                fallback_backend = create_embedding_backend(
+                    fallback_name,
+                    llama_stack_url=llama_stack_url,
+                    embedding_model=embedding_model
+                )
+        
+        self.backend = backend
+        self.fallback_backend = fallback_backend
+        # Backend that embedded the documents; queries must use the same one
+        self.active_backend = backend
+        
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Embed a list of documents"""
-        embeddings = []
-        for text in texts:
-            try:
-                # Use Llama Stack's embedding API
-                response = self.client.inference.embeddings(
-                    model_id=self.embedding_model,
-                    contents=[text]
-                )
-                # Extract embedding vector
-                if hasattr(response, 'embeddings') and len(response.embeddings) > 0:
-                    embeddings.append(response.embeddings[0])
-                else:
-                    logger.warning(f"No embedding returned for text: {text[:100]}")
-                    embeddings.append([0.0] * 384)  # Granite 125M dimension
-            except Exception as e:
-                logger.error(f"Embedding error: {e}")
-                embeddings.append([0.0] * 384)
-                
-        return embeddings
+        try:
+            return self.active_backend.embed(texts)
+        except EmbeddingBackendError as e:
+            logger.error(f"Embedding error ({self.active_backend.name}): {e}")
+        
+        if self.fallback_backend is not None and self.active_backend is not self.fallback_backend:
+            logger.warning(
+                f"Switching to degraded '{self.fallback_backend.name}' embeddings "
+                f"for {len(texts)} texts"
+            )
+            self.active_backend = self.fallback_backend
+            return self.active_backend.embed(texts)
+        
+        return [[0.0] * 384 for _ in texts]  # Granite 125M dimension
         
     def embed_query(self, text: str) -> List[float]:
-        """Embed a single query"""
-        return self.embed_documents([text])[0]
+        """Embed a single query with the backend used for the documents"""
+        return self.embed_queries([text])[0]
+        
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one batched backend call"""
+        try:
+            return self.active_backend.embed(texts)
+        except EmbeddingBackendError as e:
+            logger.error(f"Query embedding error ({self.active_backend.name}): {e}")
+            return [[0.0] * 384 for _ in texts]
 
 
 class K8sHybridRetriever:
@@ -73,18 +126,33 @@ class K8sHybridRetriever:
     5. Combine with EnsembleRetriever (RRF)
     6. Return results
     7. Discard indexes (ephemeral)
+    
+    Results are cached process-wide by (corpus fingerprint, normalized
+    query, k); with defer_build=True the indexes are only built on the
+    first cache miss, so repeated questions skip chunking and embedding.
     """
     
-    def __init__(self, log_content: str, llama_stack_url: str):
+    def __init__(
+        self,
+        log_content: str,
+        llama_stack_url: str,
+        index_type: Optional[str] = None,
+        defer_build: bool = False
+    ):
         """
         Initialize hybrid retriever with log content
         
         Args:
             log_content: Raw log text (from K8sLogFetcher)
             llama_stack_url: URL to Llama Stack for embeddings
+            index_type: FAISS index type ("auto", "flat", "hnsw", "sq8", "ivfpq")
+                        Defaults to FAISS_INDEX_TYPE env var, then "auto"
+            defer_build: Build indexes on first cache miss instead of now
         """
         self.log_content = log_content
         self.llama_stack_url = llama_stack_url
+        self.index_type = index_type or os.getenv("FAISS_INDEX_TYPE", "auto")
+        self.signature_pin_limit = int(os.getenv("SIGNATURE_PIN_LIMIT", "3"))
         
         # Initialize embeddings (Granite 125M via Llama Stack)
         logger.info("Initializing Granite embeddings...")
@@ -94,11 +162,29 @@ class K8sHybridRetriever:
             embedding_model=embedding_model
         )
         
+        # Retrieval-result cache (shared across retriever instances)
+        self.cache = get_retrieval_cache()
+        self.corpus_fingerprint = fingerprint_text(
+            log_content, embedding_model, self.embeddings.backend.name, self.index_type
+        )
+        self.last_cache_hit = None
+        
+        self.hybrid_retriever = None
+        if not defer_build:
+            self.build_indexes()
+        
+    def build_indexes(self):
+        """
+        Chunk the logs and build BM25 + FAISS + ensemble retrievers
+        """
         # Load and chunk documents (NVIDIA's settings: 20K chars, 50% overlap)
         logger.info("Chunking documents...")
         self.doc_splits = self.load_and_split_documents()
         logger.info(f"Created {len(self.doc_splits)} chunks")
         
+        # One regex pass over the raw logs for known failure signatures
+        self.pinned_docs = self.find_signature_chunks()
+        
         # Create retrievers
         logger.info("Building BM25 index...")
         self.bm25_retriever = self.create_bm25_retriever()
@@ -128,12 +214,59 @@ class K8sHybridRetriever:
             chunk_size=1000,       # 1K characters per chunk (fits BGE reranker)
             chunk_overlap=200,     # 20% overlap
             length_function=len,
-            separators=["\n\n", "\n", " ", ""]
+            separators=["\n\n", "\n", " ", ""],
+            add_start_index=True   # Maps chunks back to signature offsets
         )
         
         doc_splits = text_splitter.split_documents([doc])
         return doc_splits
         
+    def find_signature_chunks(self) -> List[Document]:
+        """
+        Chunks containing well-known failure signatures (OOMKilled,
+        ImagePullBackOff, missing configmaps, exit code 137, ...)
+        
+        Returns:
+            Chunks to pin, with metadata['failure_signatures'] labels
+        """
+        matches = scan_signatures(self.log_content)
+        if not matches:
+            return []
+        
+        starts = [m.start for m in matches]
+        chunk_labels = [
+            chunk_signatures(matches, doc.metadata.get('start_index', 0), len(doc.page_content), starts)
+            for doc in self.doc_splits
+        ]
+        pinned = [
+            Document(
+                page_content=self.doc_splits[i].page_content,
+                metadata={**self.doc_splits[i].metadata, 'failure_signatures': chunk_labels[i]}
+            )
+            for i in select_pinned_chunks(chunk_labels, limit=self.signature_pin_limit)
+        ]
+        
+        logger.info(f"Failure signatures found: {sorted({m.label for m in matches})} "
+                    f"(pinning {len(pinned)} chunks)")
+        return pinned
+        
+    def _pin_signature_chunks(self, documents: List[Document], k: int) -> List[Document]:
+        """Put signature chunks first, followed by the ranked results"""
+        if not self.pinned_docs:
+            return documents
+        
+        pinned_contents = {doc.page_content for doc in self.pinned_docs}
+        top_score = max((doc.metadata.get('rrf_score', 0.0) for doc in documents), default=0.0)
+        pinned = []
+        for doc in self.pinned_docs:
+            metadata = dict(doc.metadata)
+            if documents and 'rrf_score' in documents[0].metadata:
+                metadata['rrf_score'] = top_score
+            pinned.append(Document(page_content=doc.page_content, metadata=metadata))
+        
+        rest = [doc for doc in documents if doc.page_content not in pinned_contents]
+        return (pinned + rest)[:max(k, len(pinned))]
+        
     def create_bm25_retriever(self) -> BM25Retriever:
         """
         Create BM25 retriever (lexical/keyword matching)
@@ -152,11 +285,19 @@ class K8sHybridRetriever:
         Returns:
             FAISS retriever instance
         """
-        # Build FAISS index with Granite embeddings
-        faiss_vectorstore = FAISS.from_documents(
-            self.doc_splits,
-            self.embeddings
+        # Embed chunks with Granite, then build the selected index type
+        texts = [doc.page_content for doc in self.doc_splits]
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        index = build_faiss_index(vectors, index_type=self.index_type)
+        
+        docstore_ids = [str(i) for i in range(len(self.doc_splits))]
+        faiss_vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(dict(zip(docstore_ids, self.doc_splits))),
+            index_to_docstore_id=dict(enumerate(docstore_ids))
         )
+        self.faiss_vectorstore = faiss_vectorstore
         
         # Configure retriever
         faiss_retriever = faiss_vectorstore.as_retriever(
@@ -187,6 +328,8 @@ class K8sHybridRetriever:
         Returns:
             EnsembleRetriever ready for queries
         """
+        if self.hybrid_retriever is None:
+            self.build_indexes()
         return self.hybrid_retriever
         
     def retrieve(self, query: str, k: int = 5) -> List[Document]:
@@ -200,20 +343,113 @@ class K8sHybridRetriever:
         Returns:
             List of relevant Document objects
         """
+        cache_key = ("k8s", self.corpus_fingerprint, normalize_query(query), k)
+        cached = self.cache.get(cache_key)
+        self.last_cache_hit = cached is not None
+        if cached is not None:
+            logger.info(f"Retrieval cache hit for query: {query[:100]}")
+            return _copy_documents(cached)
+        
+        hybrid_retriever = self.get_retriever()
+        
         # Update k for retrievers
         self.bm25_retriever.k = k
         self.faiss_retriever.search_kwargs['k'] = k
         
         # Retrieve using hybrid approach (RRF happens automatically)
-        documents = self.hybrid_retriever.get_relevant_documents(query)
+        documents = hybrid_retriever.get_relevant_documents(query)[:k]
+        documents = self._pin_signature_chunks(documents, k)
+        self.cache.put(cache_key, _copy_documents(documents))
         
         logger.info(f"Retrieved {len(documents)} documents for query: {query[:100]}")
-        return documents[:k]
+        return documents
+        
+    def retrieve_multi(self, queries: List[str], k: int = 5, rrf_k: int = 60) -> List[Document]:
+        """
+        Retrieve for several phrasings of one question in one pass
+        
+        All phrasings are embedded in one batched call and searched with a
+        single FAISS search; BM25 runs per phrasing. Every ranked list is
+        fused with weighted RRF (same 50/50 weights and constant as the
+        EnsembleRetriever). Each result carries its fused score in
+        metadata['rrf_score'].
+        
+        Args:
+            queries: Query phrasings (duplicates after normalization are dropped)
+            k: Number of results to return
+            rrf_k: RRF constant
+            
+        Returns:
+            List of relevant Document objects
+        """
+        unique_queries = {}
+        for query in queries:
+            if query and query.strip():
+                unique_queries.setdefault(normalize_query(query), query)
+        queries = list(unique_queries.values())
+        if not queries:
+            return []
+        
+        cache_key = ("k8s-multi", self.corpus_fingerprint, tuple(unique_queries.keys()), k)
+        cached = self.cache.get(cache_key)
+        self.last_cache_hit = cached is not None
+        if cached is not None:
+            logger.info(f"Retrieval cache hit for {len(queries)} phrasings")
+            return _copy_documents(cached)
+        
+        self.get_retriever()
+        
+        # Lexical: one BM25 pass per phrasing (local, cheap)
+        self.bm25_retriever.k = k
+        bm25_lists = [self.bm25_retriever.get_relevant_documents(q) for q in queries]
+        
+        # Semantic: one embeddings call + one FAISS search for all phrasings
+        vectorstore = self.faiss_vectorstore
+        query_vectors = np.asarray(self.embeddings.embed_queries(queries), dtype=np.float32)
+        _, id_matrix = vectorstore.index.search(query_vectors, k)
+        faiss_lists = [
+            [
+                vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+                for i in row if i != -1
+            ]
+            for row in id_matrix
+        ]
+        
+        # Weighted RRF across all lists (0.5 BM25 / 0.5 FAISS, like the ensemble)
+        fused = {}
+        for ranked_lists, weight in ((bm25_lists, 0.5), (faiss_lists, 0.5)):
+            for ranked in ranked_lists:
+                for rank, doc in enumerate(ranked, start=1):
+                    entry = fused.setdefault(doc.page_content, [0.0, doc])
+                    entry[0] += weight / (rrf_k + rank)
+        
+        ranked_docs = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)[:k]
+        documents = [
+            Document(
+                page_content=doc.page_content,
+                metadata={**doc.metadata, 'rrf_score': score}
+            )
+            for score, doc in ranked_docs
+        ]
+        documents = self._pin_signature_chunks(documents, k)
+        self.cache.put(cache_key, _copy_documents(documents))
+        
+        logger.info(f"Retrieved {len(documents)} documents for {len(queries)} phrasings")
+        return documents
+
+
+def _copy_documents(documents: List[Document]) -> List[Document]:
+    """Copy Documents so cached results are not mutated by callers"""
+    return [
+        Document(page_content=doc.page_content, metadata=dict(doc.metadata))
+        for doc in documents
+    ]
 
 
 def create_k8s_hybrid_retriever(
     log_content: str,
-    llama_stack_url: str
+    llama_stack_url: str,
+    index_type: Optional[str] = None
 ) -> K8sHybridRetriever:
     """
     Factory function to create hybrid retriever
@@ -221,9 +457,10 @@ def create_k8s_hybrid_retriever(
     Args:
         log_content: Raw log text from OpenShift
         llama_stack_url: URL to Llama Stack service
+        index_type: FAISS index type (default: FAISS_INDEX_TYPE env or "auto")
         
     Returns:
         Initialized K8sHybridRetriever
     """
-    return K8sHybridRetriever(log_content, llama_stack_url)
+    return K8sHybridRetriever(log_content, llama_stack_url, index_type=index_type)
 
@@ -30,7 +30,8 @@ class K8sLogFetcher:
         pod_name: str,
         container: Optional[str] = None,
         tail: Optional[int] = None,
-        previous: bool = False
+        previous: bool = False,
+        timestamps: bool = True
     ) -> str:
         """
         Fetch logs from a specific pod
@@ -41,6 +42,8 @@ class K8sLogFetcher:
             container: Container name (optional, uses first container if not specified)
             tail: Number of lines to fetch (optional, fetches all if not specified)
             previous: Fetch logs from previous terminated container
+            timestamps: Prefix each line with its RFC3339 timestamp
+                        (lets GraphState.time_window filter every line)
             
         Returns:
             Log content as string
@@ -56,6 +59,9 @@ class K8sLogFetcher:
         if previous:
             cmd.append("--previous")
             
+        if timestamps:
+            cmd.append("--timestamps")
+            
         try:
             logger.info(f"Fetching logs: {' '.join(cmd)}")
             result = subprocess.run(
@@ -82,7 +88,8 @@ class K8sLogFetcher:
         self,
         namespace: str,
         label_selector: Optional[str] = None,
-        tail_per_pod: int = 1000
+        tail_per_pod: int = 1000,
+        timestamps: bool = True
     ) -> Dict[str, str]:
         """
         Fetch logs from all pods in a namespace
@@ -91,6 +98,7 @@ class K8sLogFetcher:
             namespace: Kubernetes namespace
             label_selector: Label selector to filter pods (e.g., "app=myapp")
             tail_per_pod: Number of lines to fetch per pod
+            timestamps: Prefix each line with its RFC3339 timestamp
             
         Returns:
             Dictionary mapping pod names to their log content
@@ -125,7 +133,8 @@ class K8sLogFetcher:
                 logs = self.fetch_pod_logs(
                     namespace=namespace,
                     pod_name=pod_name,
-                    tail=tail_per_pod
+                    tail=tail_per_pod,
+                    timestamps=timestamps
                 )
                 logs_dict[pod_name] = logs
                 
@@ -140,7 +149,8 @@ class K8sLogFetcher:
         namespace: str,
         pod_name: Optional[str] = None,
         label_selector: Optional[str] = None,
-        tail: int = 5000
+        tail: int = 5000,
+        timestamps: bool = True
     ) -> str:
         """
         Fetch logs and return as single text document
@@ -151,20 +161,22 @@ class K8sLogFetcher:
             pod_name: Specific pod name (optional)
             label_selector: Label selector for multiple pods (optional)
             tail: Number of lines per pod
+            timestamps: Prefix each line with its RFC3339 timestamp
             
         Returns:
             All logs concatenated as single string
         """
         if pod_name:
             # Single pod
-            logs = self.fetch_pod_logs(namespace, pod_name, tail=tail)
+            logs = self.fetch_pod_logs(namespace, pod_name, tail=tail, timestamps=timestamps)
             return f"=== Pod: {pod_name} ===\n{logs}\n"
         else:
             # Multiple pods
             logs_dict = self.fetch_namespace_logs(
                 namespace=namespace,
                 label_selector=label_selector,
-                tail_per_pod=tail
+                tail_per_pod=tail,
+                timestamps=timestamps
             )
             
             # Concatenate all logs
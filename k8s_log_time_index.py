@@ -0,0 +1,208 @@
+"""
+K8s Log Time Index - Timestamp index over raw log text
+Lets retrieval consider only log lines inside the requested time window
+
+Recognized timestamps:
+- `oc logs --timestamps` prefix: 2024-05-01T12:00:00.123456789Z <line>
+- RFC3339 anywhere near the start of a line (JSON / logfmt loggers)
+- klog header: I0501 12:00:00.123456  1 file.go:42] <line>
+
+Lines without a timestamp (stack traces, wrapped messages) belong to the
+preceding timestamped line. Text before the first timestamp and sections
+starting with a "=== ... ===" header (pod describe, events) carry no
+timestamp and are always kept.
+"""
+
+import bisect
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+# RFC3339 / RFC3339Nano, optional fraction and offset (no offset = UTC)
+RFC3339_PATTERN = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:?\d{2})?'
+)
+# klog: Lmmdd hh:mm:ss.uuuuuu (no year)
+KLOG_PATTERN = re.compile(r'^[IWEF](\d{2})(\d{2}) (\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?\s')
+SECTION_HEADER_PATTERN = re.compile(r'^\s*===.*===\s*$')
+
+# Only look for RFC3339 this far into a line (prefix or leading field)
+TIMESTAMP_SEARCH_CHARS = 64
+
+
+def _fraction_to_micros(fraction: Optional[str]) -> int:
+    return int((fraction or "0")[:6].ljust(6, "0"))
+
+
+def _parse_offset(offset: Optional[str]) -> timezone:
+    if not offset or offset == "Z":
+        return timezone.utc
+    sign = -1 if offset[0] == "-" else 1
+    digits = offset[1:].replace(":", "")
+    return timezone(sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:])))
+
+
+def parse_line_timestamp(line: str, reference_time: datetime) -> Optional[float]:
+    """
+    Parse a log line's timestamp
+
+    Args:
+        line: Single log line
+        reference_time: Aware datetime used to infer the year for klog lines
+
+    Returns:
+        POSIX timestamp, or None if the line has no recognizable timestamp
+    """
+    match = KLOG_PATTERN.match(line)
+    if match:
+        month, day, hour, minute, second, fraction = match.groups()
+        try:
+            parsed = datetime(
+                reference_time.year, int(month), int(day),
+                int(hour), int(minute), int(second),
+                _fraction_to_micros(fraction), tzinfo=timezone.utc
+            )
+        except ValueError:
+            return None
+        # klog has no year: a date after "now" belongs to last year
+        if parsed > reference_time + timedelta(days=1):
+            parsed = parsed.replace(year=parsed.year - 1)
+        return parsed.timestamp()
+
+    match = RFC3339_PATTERN.search(line, 0, TIMESTAMP_SEARCH_CHARS)
+    if match:
+        year, month, day, hour, minute, second, fraction, offset = match.groups()
+        try:
+            return datetime(
+                int(year), int(month), int(day),
+                int(hour), int(minute), int(second),
+                _fraction_to_micros(fraction), tzinfo=_parse_offset(offset)
+            ).timestamp()
+        except ValueError:
+            return None
+
+    return None
+
+
+class LogTimeIndex:
+    """
+    Sorted (timestamp, offset) index over a log buffer
+
+    Timed segments are stored sorted by timestamp so a window lookup is two
+    binary searches; the selected segments are then emitted in original
+    text order together with the untimed sections.
+    """
+
+    def __init__(self, text: str, reference_time: Optional[datetime] = None):
+        """
+        Build the index
+
+        Args:
+            text: Raw log text
+            reference_time: Aware "now" for klog year inference (default: UTC now)
+        """
+        self.text = text
+        reference_time = reference_time or datetime.now(timezone.utc)
+
+        timed: List[Tuple[float, int, int]] = []
+        self.untimed_segments: List[Tuple[int, int]] = []
+
+        segment_start = 0
+        segment_time: Optional[float] = None
+        offset = 0
+
+        # Walk line offsets instead of splitting, so the buffer is not copied
+        while offset < len(text):
+            newline = text.find("\n", offset)
+            line_end = len(text) if newline < 0 else newline + 1
+            line = text[offset:line_end]
+
+            if SECTION_HEADER_PATTERN.match(line):
+                line_time, boundary = None, True
+            else:
+                line_time = parse_line_timestamp(line, reference_time)
+                boundary = line_time is not None
+
+            if boundary and offset > segment_start:
+                self._close_segment(timed, segment_time, segment_start, offset)
+                segment_start = offset
+            if boundary:
+                segment_time = line_time
+
+            offset = line_end
+
+        if offset > segment_start:
+            self._close_segment(timed, segment_time, segment_start, offset)
+
+        timed.sort()
+        self.times = [t for t, _, _ in timed]
+        self.timed_segments = [(start, end) for _, start, end in timed]
+
+    def _close_segment(self, timed, segment_time, start, end):
+        if segment_time is None:
+            if self.untimed_segments and self.untimed_segments[-1][1] == start:
+                self.untimed_segments[-1] = (self.untimed_segments[-1][0], end)
+            else:
+                self.untimed_segments.append((start, end))
+        else:
+            timed.append((segment_time, start, end))
+
+    @property
+    def has_timestamps(self) -> bool:
+        return bool(self.times)
+
+    def slice(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> str:
+        """
+        Text of all lines inside [start, end] plus all untimed sections
+
+        Args:
+            start: Window start (aware datetime, None = unbounded)
+            end: Window end (aware datetime, None = unbounded)
+
+        Returns:
+            Filtered log text in original order
+        """
+        lo = bisect.bisect_left(self.times, start.timestamp()) if start else 0
+        hi = bisect.bisect_right(self.times, end.timestamp()) if end else len(self.times)
+
+        segments = self.timed_segments[lo:hi] + self.untimed_segments
+        segments.sort()
+        return "".join(self.text[s:e] for s, e in segments)
+
+
+def filter_log_window(
+    text: str,
+    window_minutes: Optional[int],
+    now: Optional[datetime] = None
+) -> str:
+    """
+    Keep only log lines from the last window_minutes
+
+    Args:
+        text: Raw log text
+        window_minutes: Window size in minutes (None/0 = no filtering)
+        now: Aware window end (default: UTC now)
+
+    Returns:
+        Filtered text (unchanged if the text has no timestamps or no
+        timestamped line falls inside the window)
+    """
+    if not text or not window_minutes or window_minutes <= 0:
+        return text
+
+    now = now or datetime.now(timezone.utc)
+    index = LogTimeIndex(text, reference_time=now)
+    if not index.has_timestamps:
+        return text
+
+    start = now - timedelta(minutes=window_minutes)
+    # Logs older than the window (e.g. a pod that stopped logging) would
+    # leave only the untimed sections; keep everything instead
+    if index.times[-1] < start.timestamp():
+        return text
+
+    return index.slice(start=start)
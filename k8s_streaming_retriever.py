@@ -0,0 +1,540 @@
+"""
+K8s Streaming Retriever - Memory-bounded hybrid retrieval for very large logs
+
+K8sHybridRetriever keeps the raw log string, every chunk Document, the BM25
+corpus and the FAISS vectors in memory at once. This retriever builds the
+same BM25 + vector + RRF pipeline from a line iterator instead:
+
+- Log text is written once to a disk file; chunks are (start, end) offsets
+- BM25 postings are spilled to partition files (one contiguous range of
+  term buckets each), then merged into flat disk-backed arrays (term
+  offsets, doc ids, term frequencies) one partition at a time
+- Vectors are embedded in small batches and appended to a disk-backed array
+- Terms are hashed into a fixed number of buckets, so vocabulary memory is
+  bounded regardless of how many unique request IDs the logs contain
+- Failure signatures are matched per chunk as it is built; only the latest
+  chunk per signature is remembered, and those chunks are pinned to the top
+  of results like K8sHybridRetriever does
+
+Buffer sizes are derived from a configurable memory ceiling
+(STREAMING_MEMORY_LIMIT_MB, default 512). Files are never memory-mapped:
+the postings merge writes its output sequentially and searches read
+vectors, postings and chunk text in bounded blocks with pread, so file
+pages do not accumulate in the process RSS as the input grows.
+"""
+
+import logging
+import math
+import os
+import re
+import shutil
+import tempfile
+import weakref
+import zlib
+from array import array
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+
+from v7_failure_signatures import select_pinned_chunks, text_signatures
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Yield lines (with newlines) from a string without building a list"""
+    start = 0
+    while start < len(text):
+        end = text.find('\n', start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end + 1]
+        start = end + 1
+
+
+class StreamingHybridRetriever:
+    """
+    Disk-backed BM25 + vector retriever built from a stream of log lines
+
+    Same chunking (1K chars, 200 overlap), RRF weights (0.5/0.5) and
+    retrieve / retrieve_multi interface as K8sHybridRetriever.
+    """
+
+    def __init__(
+        self,
+        lines: Iterable[str],
+        llama_stack_url: str = None,
+        embeddings=None,
+        memory_limit_mb: Optional[int] = None,
+        workdir: Optional[str] = None,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        vocab_buckets: int = 1 << 20,
+        num_partitions: int = 128,
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        """
+        Build the retriever from a line iterator
+
+        Args:
+            lines: Iterable of log lines (e.g. iter_lines over a log buffer)
+            llama_stack_url: URL to Llama Stack (used if embeddings is None)
+            embeddings: LangChain Embeddings (default: GraniteEmbeddings)
+            memory_limit_mb: Memory ceiling used to size buffers
+            workdir: Directory for spill files (default: private temp dir)
+            chunk_size: Characters per chunk
+            chunk_overlap: Characters of overlap between chunks
+            vocab_buckets: Hashed vocabulary size for BM25 terms
+            num_partitions: Postings spill partitions (merge works on one at a time)
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+        """
+        self.memory_limit_mb = memory_limit_mb or int(os.getenv("STREAMING_MEMORY_LIMIT_MB", "512"))
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.vocab_buckets = vocab_buckets
+        self.num_partitions = num_partitions
+        self.terms_per_partition = -(-vocab_buckets // num_partitions)
+        self.k1 = k1
+        self.b = b
+        self.signature_pin_limit = int(os.getenv("SIGNATURE_PIN_LIMIT", "3"))
+
+        # Budget split: 1/8 for the postings spill buffer (12 bytes per
+        # entry), 1/16 for vector scan blocks; the rest is headroom for the
+        # interpreter, partition merges and embedding batches
+        budget = self.memory_limit_mb * 1024 * 1024
+        self.spill_threshold = max(1 << 16, budget // 8 // 12)
+        self.scan_budget_bytes = max(1 << 20, budget // 16)
+        self.embed_batch_size = 64
+
+        if embeddings is None:
+            from k8s_hybrid_retriever import GraniteEmbeddings
+            embeddings = GraniteEmbeddings(
+                llama_stack_url=llama_stack_url,
+                embedding_model=os.getenv("EMBEDDING_MODEL", "granite-embedding-125m")
+            )
+        self.embeddings = embeddings
+
+        if workdir is None:
+            workdir = tempfile.mkdtemp(prefix="k8s-retriever-")
+            self._cleanup = weakref.finalize(self, shutil.rmtree, workdir, True)
+        else:
+            os.makedirs(workdir, exist_ok=True)
+            self._cleanup = None
+        self.workdir = workdir
+
+        # Not cached: the corpus is too large to fingerprint cheaply per query
+        self.last_cache_hit = False
+
+        logger.info(f"Building streaming retriever (memory limit {self.memory_limit_mb} MB)...")
+        self.build(lines)
+        logger.info(f"✅ Streaming retriever ready: {self.num_chunks} chunks")
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.workdir, name)
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+
+    def build(self, lines: Iterable[str]):
+        """
+        Chunk, tokenize and embed the stream, spilling everything to disk
+
+        Args:
+            lines: Iterable of log lines
+        """
+        self._text_file = open(self._path("text.bin"), "wb")
+        self._vector_file = open(self._path("vectors.bin"), "wb")
+        self._partition_files = [
+            open(self._path(f"postings-{p}.bin"), "wb")
+            for p in range(self.num_partitions)
+        ]
+        self._chunk_bounds = array('q')
+        self._doc_lengths = array('i')
+        self._df = np.zeros(self.vocab_buckets, dtype=np.int32)
+        self._triples = array('i')
+        self._pending_texts: List[str] = []
+        self._signature_latest: Dict[str, int] = {}
+        self._signature_labels: Dict[int, List[str]] = {}
+        self._vectors_written = 0
+        self._embedding_backend = getattr(self.embeddings, 'active_backend', None)
+        self.dimension = None
+
+        window = deque()  # (byte offset, byte length, text)
+        window_chars = 0
+        offset = 0
+        has_new_text = False
+
+        for line in lines:
+            for piece in self._split_long(line):
+                if window and window_chars + len(piece) > self.chunk_size:
+                    if has_new_text:
+                        self._add_chunk(window)
+                        has_new_text = False
+                    # Keep only the overlap tail for the next chunk
+                    while window and (
+                        window_chars > self.chunk_overlap
+                        or window_chars + len(piece) > self.chunk_size
+                    ):
+                        window_chars -= len(window.popleft()[2])
+
+                data = piece.encode("utf-8")
+                self._text_file.write(data)
+                window.append((offset, len(data), piece))
+                window_chars += len(piece)
+                offset += len(data)
+                has_new_text = True
+
+        if has_new_text:
+            self._add_chunk(window)
+
+        self._flush_embeddings()
+        self._spill_postings()
+        self._finalize()
+
+    def _split_long(self, line: str) -> Iterator[str]:
+        if len(line) <= self.chunk_size:
+            yield line
+            return
+        for start in range(0, len(line), self.chunk_size):
+            yield line[start:start + self.chunk_size]
+
+    def _hash_terms(self, text: str) -> np.ndarray:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        return np.fromiter(
+            (zlib.crc32(t.encode("utf-8")) for t in tokens),
+            dtype=np.uint32,
+            count=len(tokens)
+        ) % self.vocab_buckets
+
+    def _add_chunk(self, window: deque):
+        doc_id = len(self._doc_lengths)
+        start = window[0][0]
+        end = window[-1][0] + window[-1][1]
+        text = "".join(piece for _, _, piece in window)
+        self._chunk_bounds.extend((start, end))
+
+        term_ids = self._hash_terms(text)
+        self._doc_lengths.append(len(term_ids))
+        if len(term_ids):
+            terms, counts = np.unique(term_ids, return_counts=True)
+            self._df[terms] += 1
+            triples = np.empty((len(terms), 3), dtype=np.int32)
+            triples[:, 0] = terms
+            triples[:, 1] = doc_id
+            triples[:, 2] = counts
+            self._triples.frombytes(triples.tobytes())
+            if len(self._triples) >= 3 * self.spill_threshold:
+                self._spill_postings()
+
+        self._pending_texts.append(text)
+        if len(self._pending_texts) >= self.embed_batch_size:
+            self._flush_embeddings()
+
+        self._track_signatures(doc_id, text)
+
+    def _track_signatures(self, doc_id: int, text: str):
+        """Remember the latest chunk per failure signature (bounded by the label count)"""
+        labels = text_signatures(text)
+        if not labels:
+            return
+        self._signature_labels[doc_id] = labels
+        for label in labels:
+            self._signature_latest[label] = doc_id
+        latest_ids = set(self._signature_latest.values())
+        for stale_id in [i for i in self._signature_labels if i not in latest_ids]:
+            del self._signature_labels[stale_id]
+
+    def _spill_postings(self):
+        """Append buffered (term, doc, tf) triples to their partition files"""
+        if not self._triples:
+            return
+        triples = np.frombuffer(self._triples, dtype=np.int32).reshape(-1, 3)
+        partition = triples[:, 0] // self.terms_per_partition
+        for p in np.unique(partition):
+            self._partition_files[p].write(triples[partition == p].tobytes())
+        del triples, partition
+        self._triples = array('i')
+
+    def _flush_embeddings(self):
+        """Embed pending chunk texts and append them to the vector file"""
+        if not self._pending_texts:
+            return
+        vectors = np.asarray(self.embeddings.embed_documents(self._pending_texts), dtype=np.float32)
+
+        # GraniteEmbeddings may switch to its fallback backend mid-stream;
+        # earlier vectors must then be re-embedded into the same space
+        backend = getattr(self.embeddings, 'active_backend', None)
+        if backend is not self._embedding_backend and self._vectors_written:
+            logger.warning("Embedding backend changed mid-build, re-embedding earlier chunks")
+            self._reembed_written_chunks()
+        self._embedding_backend = backend
+
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        self._vector_file.write(vectors.tobytes())
+        self._vectors_written += len(vectors)
+        self._pending_texts = []
+
+    def _reembed_written_chunks(self):
+        self._text_file.flush()
+        self._vector_file.close()
+        self._vector_file = open(self._path("vectors.bin"), "wb")
+        bounds = np.frombuffer(self._chunk_bounds, dtype=np.int64).reshape(-1, 2)
+
+        with open(self._path("text.bin"), "rb") as text_file:
+            for start in range(0, self._vectors_written, self.embed_batch_size):
+                texts = []
+                for chunk_start, chunk_end in bounds[start:min(start + self.embed_batch_size, self._vectors_written)]:
+                    text_file.seek(chunk_start)
+                    texts.append(text_file.read(chunk_end - chunk_start).decode("utf-8", errors="replace"))
+                vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+                self._vector_file.write(vectors.tobytes())
+
+    def _finalize(self):
+        """Merge postings partitions into flat files and open the index files for reading"""
+        for f in self._partition_files + [self._text_file, self._vector_file]:
+            f.close()
+
+        self.num_chunks = len(self._doc_lengths)
+        self.chunk_bounds = np.frombuffer(self._chunk_bounds, dtype=np.int64).reshape(-1, 2).copy()
+        self.doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.int32).copy()
+        self.avgdl = float(self.doc_lengths.mean()) if self.num_chunks else 0.0
+        del self._chunk_bounds, self._doc_lengths, self._triples
+
+        # Chunk ids are increasing, so positions in this list keep chunk order
+        signature_ids = sorted(self._signature_labels)
+        chunk_labels = [self._signature_labels[doc_id] for doc_id in signature_ids]
+        self.pinned_signatures = {
+            signature_ids[i]: chunk_labels[i]
+            for i in select_pinned_chunks(chunk_labels, limit=self.signature_pin_limit)
+        }
+        if self.pinned_signatures:
+            logger.info(f"Failure signatures found: {sorted(self._signature_latest)} "
+                        f"(pinning {len(self.pinned_signatures)} chunks)")
+        del self._signature_latest, self._signature_labels
+
+        self.df = self._df
+        self.term_offsets = np.zeros(self.vocab_buckets + 1, dtype=np.int64)
+        np.cumsum(self.df, out=self.term_offsets[1:])
+        nnz = int(self.term_offsets[-1])
+
+        # Partitions cover consecutive term ranges, so each one sorted by
+        # (term, doc) is exactly the next stretch of the flat arrays
+        written = 0
+        with open(self._path("postings_docs.bin"), "wb") as docs_file, \
+                open(self._path("postings_tfs.bin"), "wb") as tfs_file:
+            for p in range(self.num_partitions):
+                path = self._path(f"postings-{p}.bin")
+                triples = np.fromfile(path, dtype=np.int32).reshape(-1, 3)
+                os.remove(path)
+                if not len(triples):
+                    continue
+                triples = triples[np.lexsort((triples[:, 1], triples[:, 0]))]
+                docs_file.write(np.ascontiguousarray(triples[:, 1]).tobytes())
+                tfs_file.write(np.ascontiguousarray(triples[:, 2]).tobytes())
+                written += len(triples)
+                del triples
+        if written != nnz:
+            raise RuntimeError(f"Postings merge wrote {written} of {nnz} entries")
+
+        self._fds = {
+            name: os.open(self._path(f"{name}.bin"), os.O_RDONLY)
+            for name in ("postings_docs", "postings_tfs", "vectors", "text")
+        }
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def _read_block(self, name: str, dtype, start: int, count: int) -> np.ndarray:
+        """Read count items of dtype at item offset start (one pread, no mapping)"""
+        itemsize = np.dtype(dtype).itemsize
+        data = os.pread(self._fds[name], int(count) * itemsize, int(start) * itemsize)
+        return np.frombuffer(data, dtype=dtype)
+
+    def chunk_text(self, doc_id: int) -> str:
+        """Read one chunk's text from the log file"""
+        start, end = self.chunk_bounds[doc_id]
+        return os.pread(self._fds["text"], int(end - start), int(start)).decode("utf-8", errors="replace")
+
+    def _bm25_scores(self, query: str) -> np.ndarray:
+        """BM25 Okapi scores for every chunk (dense float32 array)"""
+        scores = np.zeros(self.num_chunks, dtype=np.float32)
+        block_size = max(1, self.scan_budget_bytes // 8)
+        for term in np.unique(self._hash_terms(query)):
+            lo, hi = self.term_offsets[term], self.term_offsets[term + 1]
+            if lo == hi:
+                continue
+            df = hi - lo
+            idf = math.log((self.num_chunks - df + 0.5) / (df + 0.5) + 1.0)
+            # Frequent terms have long posting lists: read them in blocks
+            for start in range(lo, hi, block_size):
+                count = min(block_size, hi - start)
+                docs = self._read_block("postings_docs", np.int32, start, count)
+                tfs = self._read_block("postings_tfs", np.int32, start, count).astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avgdl)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        return scores
+
+    def _top_bm25(self, query: str, k: int) -> List[int]:
+        scores = self._bm25_scores(query)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")].tolist()
+
+    def _top_vector(self, query_vector: np.ndarray, k: int) -> List[int]:
+        """Exact L2 search, scanning the vector file in bounded blocks"""
+        block_rows = max(1, self.scan_budget_bytes // (self.dimension * 4 * 2))
+        best_ids = np.empty(0, dtype=np.int64)
+        best_dist = np.empty(0, dtype=np.float32)
+
+        for start in range(0, self.num_chunks, block_rows):
+            rows = min(block_rows, self.num_chunks - start)
+            block = self._read_block("vectors", np.float32, start * self.dimension, rows * self.dimension)
+            block = block.reshape(rows, self.dimension)
+            # ||x - q||^2 up to the constant ||q||^2
+            dist = np.einsum("ij,ij->i", block, block) - 2 * (block @ query_vector)
+            ids = np.concatenate([best_ids, np.arange(start, start + len(block))])
+            dist = np.concatenate([best_dist, dist])
+            if len(ids) > k:
+                keep = np.argpartition(dist, k)[:k]
+                ids, dist = ids[keep], dist[keep]
+            best_ids, best_dist = ids, dist
+
+        return best_ids[np.argsort(best_dist, kind="stable")].tolist()
+
+    def retrieve_multi(self, queries: List[str], k: int = 5, rrf_k: int = 60) -> List[Document]:
+        """
+        Retrieve for several phrasings, fused with weighted RRF
+
+        Args:
+            queries: Query phrasings
+            k: Number of results to return
+            rrf_k: RRF constant
+
+        Returns:
+            List of Document objects (metadata carries chunk_id and rrf_score)
+        """
+        queries = [q for q in dict.fromkeys(queries) if q and q.strip()]
+        if not queries or not self.num_chunks:
+            return []
+
+        if hasattr(self.embeddings, 'embed_queries'):
+            query_vectors = self.embeddings.embed_queries(queries)
+        else:
+            query_vectors = [self.embeddings.embed_query(q) for q in queries]
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+
+        fused = {}
+        for query, query_vector in zip(queries, query_vectors):
+            for ranked in (self._top_bm25(query, k), self._top_vector(query_vector, k)):
+                for rank, doc_id in enumerate(ranked, start=1):
+                    fused[doc_id] = fused.get(doc_id, 0.0) + 0.5 / (rrf_k + rank)
+
+        ranked_ids = sorted(fused, key=fused.get, reverse=True)
+        documents = self._pin_signature_chunks(ranked_ids, fused, k)
+
+        logger.info(f"Retrieved {len(documents)} documents for {len(queries)} phrasings")
+        return documents
+
+    def _pin_signature_chunks(self, ranked_ids: List[int], fused: Dict[int, float], k: int) -> List[Document]:
+        """Signature chunks first (with the top fused score), then the ranked results"""
+        top_score = fused[ranked_ids[0]] if ranked_ids else 0.0
+        rest = [doc_id for doc_id in ranked_ids if doc_id not in self.pinned_signatures]
+        documents = [
+            Document(
+                page_content=self.chunk_text(doc_id),
+                metadata={"source": "k8s_logs", "chunk_id": doc_id, "rrf_score": top_score,
+                          "failure_signatures": labels}
+            )
+            for doc_id, labels in self.pinned_signatures.items()
+        ]
+        documents += [
+            Document(
+                page_content=self.chunk_text(doc_id),
+                metadata={"source": "k8s_logs", "chunk_id": doc_id, "rrf_score": fused[doc_id]}
+            )
+            for doc_id in rest[:max(k - len(documents), 0)]
+        ]
+        return documents
+
+    def retrieve(self, query: str, k: int = 5) -> List[Document]:
+        """Retrieve relevant documents for a single query"""
+        return self.retrieve_multi([query], k=k)
+
+    def close(self):
+        """Close the index files and delete spill files"""
+        for fd in getattr(self, "_fds", {}).values():
+            os.close(fd)
+        self._fds = {}
+        if self._cleanup is not None:
+            self._cleanup()
+
+
+def _synthetic_log_lines(total_mb: int) -> Iterator[str]:
+    """Generate a large synthetic log stream without holding it in memory"""
+    total_bytes = total_mb * 1024 * 1024
+    written = 0
+    i = 0
+    while written < total_bytes:
+        if i % 5000 == 4999:
+            line = f"2025-01-01T00:00:00Z ERROR container app-{i % 97} OOMKilled exit code 137\n"
+        else:
+            line = (f"2025-01-01T00:00:00Z INFO request id={i:012d} path=/api/v1/items/{i % 1013} "
+                    f"status=200 latency_ms={i % 337}\n")
+        written += len(line)
+        i += 1
+        yield line
+
+
+def _measure_streaming_build(total_mb: int, memory_limit_mb: int, queue):
+    """Child process: build from a synthetic stream and report peak RSS"""
+    import resource
+    from k8s_embedding_backends import HashingEmbeddingBackend
+    from k8s_hybrid_retriever import GraniteEmbeddings
+
+    embeddings = GraniteEmbeddings(llama_stack_url=None, backend=HashingEmbeddingBackend())
+    retriever = StreamingHybridRetriever(
+        _synthetic_log_lines(total_mb),
+        embeddings=embeddings,
+        memory_limit_mb=memory_limit_mb
+    )
+    docs = retriever.retrieve("why was the container OOMKilled exit code 137", k=5)
+    found = any("OOMKilled" in doc.page_content for doc in docs)
+    retriever.close()
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    queue.put((peak_rss_mb, found))
+
+
+def test_streaming_retriever_memory(total_mb: int = 768, memory_limit_mb: int = 256):
+    """
+    Build from a synthetic stream several times larger than the memory
+    ceiling in a fresh process and check its peak RSS stays under it
+    """
+    import multiprocessing
+
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_measure_streaming_build, args=(total_mb, memory_limit_mb, queue))
+    process.start()
+    peak_rss_mb, found = queue.get()
+    process.join()
+
+    print(f"📊 {total_mb} MB of logs, limit {memory_limit_mb} MB → peak RSS {peak_rss_mb:.0f} MB")
+    assert found, "OOMKilled chunk should be retrieved"
+    assert peak_rss_mb < memory_limit_mb, "Peak RSS exceeded the memory ceiling"
+    print("✅ Streaming retriever stayed under its memory ceiling")
+
+
+if __name__ == "__main__":
+    test_streaming_retriever_memory()
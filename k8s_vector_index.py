@@ -0,0 +1,190 @@
+"""
+K8s Vector Index - Selectable FAISS index types for the hybrid retriever
+
+Index types:
+- flat:  Exact L2 search over float32 vectors (LangChain's default)
+- hnsw:  Graph-based approximate search, fast queries, extra graph memory
+- sq8:   int8 scalar-quantized vectors, exact scan at 1/4 of the memory
+- ivfpq: Inverted file + product quantization for very large corpora
+
+"auto" picks an index type from the corpus size (number of chunks).
+"""
+
+import logging
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "sq8", "ivfpq")
+
+# Automatic selection thresholds (number of vectors)
+# Below FLAT_MAX_VECTORS an exact scan is already only a few milliseconds
+FLAT_MAX_VECTORS = 10_000
+HNSW_MAX_VECTORS = 100_000
+SQ8_MAX_VECTORS = 500_000
+
+# IVF-PQ needs enough points to train its coarse and PQ codebooks
+# (FAISS wants ~39 training points per centroid)
+MIN_POINTS_PER_CENTROID = 39
+PQ_CODEBOOK_SIZE = 256  # 8 bits per sub-quantizer
+PQ_DIMS_PER_SUBQUANTIZER = 8
+# Training sample cap, raised for IVF-PQ to MIN_POINTS_PER_CENTROID per list
+MAX_TRAINING_POINTS = 20_000
+
+
+def select_index_type(num_vectors: int) -> str:
+    """
+    Pick an index type from the corpus size
+
+    Args:
+        num_vectors: Number of vectors (chunks) to index
+
+    Returns:
+        One of INDEX_TYPES
+    """
+    if num_vectors <= FLAT_MAX_VECTORS:
+        return "flat"
+    if num_vectors <= HNSW_MAX_VECTORS:
+        return "hnsw"
+    if num_vectors <= SQ8_MAX_VECTORS:
+        return "sq8"
+    return "ivfpq"
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """Largest divisor of dimension giving >= 8 dims per sub-quantizer"""
+    for m in range(max(1, dimension // PQ_DIMS_PER_SUBQUANTIZER), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def _training_sample(vectors: np.ndarray, min_points: int = 0) -> np.ndarray:
+    """
+    Random subset used to train quantizers on large corpora
+
+    Args:
+        vectors: Corpus vectors
+        min_points: Points the quantizer needs (e.g. nlist * MIN_POINTS_PER_CENTROID);
+                    the sample is MAX_TRAINING_POINTS or this, whichever is larger
+    """
+    sample_size = max(MAX_TRAINING_POINTS, min_points)
+    if len(vectors) <= sample_size:
+        return vectors
+    rng = np.random.default_rng(0)
+    idx = rng.choice(len(vectors), sample_size, replace=False)
+    return vectors[np.sort(idx)]
+
+
+def build_faiss_index(
+    vectors: np.ndarray,
+    index_type: str = "auto",
+    hnsw_m: int = 32,
+    ef_search: int = 64,
+    nprobe: int = 16
+) -> faiss.Index:
+    """
+    Build and populate a FAISS index
+
+    Args:
+        vectors: float32 array of shape (n, dimension)
+        index_type: "auto" or one of INDEX_TYPES
+        hnsw_m: HNSW graph degree
+        ef_search: HNSW search breadth (higher = better recall, slower)
+        nprobe: IVF lists probed per query
+
+    Returns:
+        Populated FAISS index (L2 metric, same as LangChain's default)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dimension = vectors.shape
+
+    if index_type == "auto":
+        index_type = select_index_type(num_vectors)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+    factory = _factory_string(index_type, num_vectors, dimension, hnsw_m)
+    if factory is None:
+        # Not enough data to train IVF-PQ codebooks
+        logger.warning(
+            f"{num_vectors} vectors too few for IVF-PQ, falling back to sq8"
+        )
+        index_type = "sq8"
+        factory = _factory_string(index_type, num_vectors, dimension, hnsw_m)
+
+    logger.info(f"Building FAISS index: {index_type} ({factory}) for {num_vectors} vectors")
+    index = faiss.index_factory(dimension, factory, faiss.METRIC_L2)
+
+    if not index.is_trained:
+        min_points = 0
+        if index_type == "ivfpq":
+            min_points = faiss.extract_index_ivf(index).nlist * MIN_POINTS_PER_CENTROID
+        index.train(_training_sample(vectors, min_points))
+
+    if index_type == "hnsw":
+        index.hnsw.efSearch = ef_search
+    elif index_type == "ivfpq":
+        faiss.extract_index_ivf(index).nprobe = nprobe
+
+    index.add(vectors)
+    return index
+
+
+def _factory_string(
+    index_type: str,
+    num_vectors: int,
+    dimension: int,
+    hnsw_m: int
+) -> Optional[str]:
+    """FAISS index_factory description for an index type"""
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    if index_type == "sq8":
+        return "SQ8"
+
+    # ivfpq: ~4*sqrt(n) lists, capped so every list gets enough training points
+    nlist = int(4 * math.sqrt(max(num_vectors, 1)))
+    nlist = min(nlist, num_vectors // MIN_POINTS_PER_CENTROID)
+    if nlist < 1 or num_vectors < MIN_POINTS_PER_CENTROID * PQ_CODEBOOK_SIZE:
+        return None
+    return f"IVF{nlist},PQ{_pq_subquantizers(dimension)}"
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """
+    Index type actually built (build_faiss_index may fall back from ivfpq to sq8)
+
+    Args:
+        index: FAISS index from build_faiss_index
+
+    Returns:
+        One of INDEX_TYPES
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "sq8"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    return "flat"
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """
+    Approximate in-memory size of an index (its serialized size)
+
+    Args:
+        index: FAISS index
+
+    Returns:
+        Size in bytes
+    """
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,120 @@
+"""
+K8s Vector Index Benchmark
+Compares FAISS index types (flat / HNSW / SQ8 / IVF-PQ) on recall@k,
+query latency, build time and memory, using flat search as ground truth.
+
+Usage:
+    python k8s_vector_index_benchmark.py --sizes 5000 50000 200000 --dim 384
+"""
+
+import argparse
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+
+from k8s_vector_index import (
+    INDEX_TYPES,
+    build_faiss_index,
+    index_memory_bytes,
+    index_type_of,
+    select_index_type
+)
+
+
+def make_corpus(num_vectors: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """
+    Synthetic clustered vectors (log chunks cluster around templates)
+    """
+    rng = np.random.default_rng(seed)
+    num_clusters = max(8, num_vectors // 200)
+    centers = rng.standard_normal((num_clusters, dimension)).astype(np.float32)
+    assignment = rng.integers(0, num_clusters, num_vectors)
+    noise = 0.3 * rng.standard_normal((num_vectors, dimension)).astype(np.float32)
+    return centers[assignment] + noise
+
+
+def benchmark_index(
+    index_type: str,
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    ground_truth: np.ndarray,
+    k: int
+) -> Dict[str, Any]:
+    """Build one index type and measure recall, latency and memory"""
+    start = time.perf_counter()
+    index = build_faiss_index(corpus, index_type=index_type)
+    build_s = time.perf_counter() - start
+
+    latencies = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, query in enumerate(queries):
+        t0 = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found[i] = ids[0]
+
+    hits = sum(
+        len(set(found[i]) & set(ground_truth[i]))
+        for i in range(len(queries))
+    )
+
+    return {
+        "index_type": index_type,
+        # Differs from index_type when IVF-PQ fell back to sq8 (too few vectors)
+        "built_type": index_type_of(index),
+        "build_s": build_s,
+        "recall": hits / float(len(queries) * k),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "memory_mb": index_memory_bytes(index) / (1024 * 1024)
+    }
+
+
+def run_benchmark(
+    sizes: List[int],
+    dimension: int = 384,
+    num_queries: int = 200,
+    k: int = 10
+) -> List[Dict[str, Any]]:
+    """Run all index types across corpus sizes and print a report"""
+    results = []
+
+    for size in sizes:
+        corpus = make_corpus(size, dimension)
+        rng = np.random.default_rng(1)
+        query_ids = rng.choice(size, num_queries, replace=False)
+        queries = corpus[query_ids] + 0.1 * rng.standard_normal(
+            (num_queries, dimension)
+        ).astype(np.float32)
+
+        exact = build_faiss_index(corpus, index_type="flat")
+        _, ground_truth = exact.search(queries, k)
+
+        print(f"\n📊 {size} vectors x {dimension} dims "
+              f"(auto selects: {select_index_type(size)})")
+        print(f"{'index':<14}{'recall@' + str(k):>10}{'p50 ms':>10}"
+              f"{'p95 ms':>10}{'build s':>10}{'mem MB':>10}")
+
+        for index_type in INDEX_TYPES:
+            row = benchmark_index(index_type, corpus, queries, ground_truth, k)
+            row["num_vectors"] = size
+            results.append(row)
+            label = row['index_type']
+            if row['built_type'] != row['index_type']:
+                label = f"{label}->{row['built_type']}"
+            print(f"{label:<14}{row['recall']:>10.3f}{row['p50_ms']:>10.3f}"
+                  f"{row['p95_ms']:>10.3f}{row['build_s']:>10.2f}{row['memory_mb']:>10.1f}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    run_benchmark(args.sizes, dimension=args.dim, num_queries=args.queries, k=args.k)
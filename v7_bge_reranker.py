@@ -4,13 +4,159 @@ Integrates BAAI BGE Reranker v2-m3 via vLLM inference service
 """
 
 import os
+import asyncio
+import httpx
 import requests
-from typing import List, Dict, Any, Tuple
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Any, NamedTuple, Optional, Set, Tuple
 import logging
+import re
+import threading
+import time
+from v7_cache import LRUTTLCache, fingerprint_text
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# BGE v2-m3 scores (query, document) pairs in a 512-token window; the
+# sentencepiece tokenizer splits words into pieces of about this many chars
+MODEL_MAX_TOKENS = 512
+CHARS_PER_PIECE = 4
+# Special tokens around and between the pair
+PAIR_OVERHEAD_TOKENS = 4
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def approx_token_count(text: str) -> int:
+    """
+    Approximate sentencepiece token count (no tokenizer download)
+    Words count one token per CHARS_PER_PIECE characters, punctuation one each
+    """
+    return sum(
+        (len(piece) + CHARS_PER_PIECE - 1) // CHARS_PER_PIECE
+        for piece in TOKEN_PATTERN.findall(text)
+    )
+
+
+def _head_within(text: str, budget: int) -> str:
+    """
+    Longest prefix of text within budget approximate tokens (binary search:
+    prefix cost only grows with length, and punctuation-heavy text costs
+    far more than CHARS_PER_PIECE characters per token)
+    """
+    lo, hi = 0, min(len(text), budget * CHARS_PER_PIECE)
+    while lo < hi:
+        middle = (lo + hi + 1) // 2
+        if approx_token_count(text[:middle]) <= budget:
+            lo = middle
+        else:
+            hi = middle - 1
+    return text[:lo]
+
+
+def truncate_to_window(query: str, document: str, max_tokens: int = MODEL_MAX_TOKENS) -> str:
+    """
+    Trim a document so the (query, document) pair fits the model window
+    
+    Lines are kept around the lines with the most query-term matches
+    (each match line plus its neighbours, best lines first), then the
+    remaining budget grows those windows; kept lines stay in document
+    order with "..." marking gaps. Without any match the head of the
+    document is kept.
+    
+    Args:
+        query: The search query
+        document: Document text
+        max_tokens: Model window for the pair
+        
+    Returns:
+        The document, or a line-trimmed version of it
+    """
+    budget = max_tokens - approx_token_count(query) - PAIR_OVERHEAD_TOKENS
+    if approx_token_count(document) <= budget:
+        return document
+    if budget <= 0:
+        return ""
+    
+    lines = document.split("\n")
+    costs = [approx_token_count(line) + 1 for line in lines]
+    query_terms = {term.lower() for term in re.findall(r"\w+", query) if len(term) > 2}
+    matches = [
+        sum(1 for term in re.findall(r"\w+", line.lower()) if term in query_terms)
+        for line in lines
+    ]
+    
+    kept = set()
+    used = 0
+    
+    def keep(position: int) -> bool:
+        nonlocal used
+        if used + costs[position] > budget:
+            return False
+        kept.add(position)
+        used += costs[position]
+        return True
+    
+    def grow(window: List[int]) -> bool:
+        """Extend a window by one line on each side (True if it moved)"""
+        moved = False
+        for side, step in ((0, -1), (1, 1)):
+            position = window[side] + step
+            if 0 <= position < len(lines) and (position in kept or keep(position)):
+                window[side] = position
+                moved = True
+        return moved
+    
+    seeds = sorted(
+        (position for position, count in enumerate(matches) if count),
+        key=lambda position: (-matches[position], position)
+    ) or [0]
+    
+    # Contiguous [lo, hi] window per kept match line, best lines first
+    # with one neighbour on each side, then grown outwards while the
+    # budget lasts
+    windows = []
+    for position in seeds:
+        if position in kept or keep(position):
+            windows.append([position, position])
+            grow(windows[-1])
+    
+    while any([grow(window) for window in windows]):
+        pass
+    
+    if not kept:
+        # A single line longer than the window: keep its head
+        return _head_within(lines[seeds[0]], budget)
+    
+    trimmed = []
+    previous = None
+    for position in sorted(kept):
+        if previous is not None and position != previous + 1:
+            trimmed.append("...")
+        trimmed.append(lines[position])
+        previous = position
+    return "\n".join(trimmed)
+
+
+class RerankResult(NamedTuple):
+    """
+    Outcome of one rerank call. Returned rather than stored on the reranker,
+    which is shared by every session (see get_nodes_instance)
+    """
+    ranked: List[Tuple[int, float]]  # (original_index, score), best first
+    fallback_ids: Set[int]  # Indices ranked with a synthetic score instead of a model score
+    cache_hits: int = 0  # Scores reused from the score cache
+    cache_misses: int = 0  # Documents that needed a /score request
+
+
+class RerankedDocuments(NamedTuple):
+    """Reranked document dicts with the call's score-cache counts"""
+    documents: List[Dict[str, Any]]
+    cache_hits: int = 0
+    cache_misses: int = 0
+
 
 class BGEReranker:
     """
@@ -22,7 +168,13 @@ class BGEReranker:
         self,
         reranker_url: str = None,
         model_name: str = "bge-reranker",
-        timeout: int = 30
+        timeout: int = 30,
+        batch_size: int = None,
+        connect_timeout: float = None,
+        pool_size: int = None,
+        max_retries: int = None,
+        cache_size: int = None,
+        max_tokens: int = None
     ):
         """
         Initialize BGE Reranker client
@@ -30,7 +182,14 @@ class BGEReranker:
         Args:
             reranker_url: URL to BGE reranker inference service
             model_name: Name of the model served
-            timeout: Request timeout in seconds
+            timeout: Read timeout in seconds
+            batch_size: Documents per /score request (env RERANK_BATCH_SIZE, default 32)
+            connect_timeout: Connect timeout in seconds (env RERANK_CONNECT_TIMEOUT, default 3)
+            pool_size: Keep-alive connections kept open (env RERANK_POOL_SIZE, default 10)
+            max_retries: Retries on 5xx / connection errors (env RERANK_MAX_RETRIES, default 2)
+            cache_size: Cached (query, document) scores (env RERANK_CACHE_SIZE, default 2048; 0 disables)
+            max_tokens: Token window per (query, document) pair; longer documents are
+                        trimmed before sending (env RERANK_MAX_TOKENS, default 512; 0 disables)
         """
         self.reranker_url = reranker_url or os.getenv(
             "BGE_RERANKER_URL",
@@ -38,95 +197,237 @@ class BGEReranker:
         )
         self.model_name = model_name
         self.timeout = timeout
+        self.connect_timeout = connect_timeout or float(os.getenv("RERANK_CONNECT_TIMEOUT", "3"))
+        self.timeouts = (self.connect_timeout, self.timeout)
+        self.batch_size = batch_size or int(os.getenv("RERANK_BATCH_SIZE", "32"))
+        self.max_tokens = int(os.getenv("RERANK_MAX_TOKENS", str(MODEL_MAX_TOKENS))) if max_tokens is None else max_tokens
+        
+        # vLLM accepts a list for text_2; None = not yet known, False = the
+        # server rejected list input, so score one document per request
+        self.supports_list_input = None
+        
+        # Scores for (model, query, document) pairs already seen, so
+        # self-correction iterations and repeated questions only send new pairs
+        self.score_cache = LRUTTLCache(
+            max_entries=int(os.getenv("RERANK_CACHE_SIZE", "2048")) if cache_size is None else cache_size,
+            ttl_seconds=float(os.getenv("RERANK_CACHE_TTL", "3600"))
+        )
+        
+        # Circuit breaker: after breaker_failures consecutive failed calls
+        # the reranker is bypassed (fallback ranking) until a background
+        # health probe succeeds
+        self.breaker_failures = int(os.getenv("RERANK_BREAKER_FAILURES", "3"))
+        self.breaker_probe_interval = float(os.getenv("RERANK_BREAKER_PROBE_SECONDS", "15"))
+        self.consecutive_failures = 0
+        self.breaker_open = False
+        self.last_health: Optional[Tuple[bool, float]] = None  # (healthy, checked_at)
+        self._breaker_lock = threading.Lock()
+        self._stop_probe = threading.Event()
+        
+        # Async scoring from sync callers runs on one background event loop
+        # with a long-lived AsyncClient, so its connections stay warm across
+        # calls instead of a new client (and handshakes) per asyncio.run
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self._async_client: Optional[httpx.AsyncClient] = None
         
         # Ensure URL has proper protocol
         if not self.reranker_url.startswith(('http://', 'https://')):
             self.reranker_url = f"http://{self.reranker_url}"
         
+        # Pooled keep-alive session: one TCP+TLS handshake per connection
+        # instead of per request
+        self.session = self._create_session(
+            pool_size=pool_size or int(os.getenv("RERANK_POOL_SIZE", "10")),
+            max_retries=int(os.getenv("RERANK_MAX_RETRIES", "2")) if max_retries is None else max_retries
+        )
+        
         logger.info(f"Initialized BGE Reranker: {self.reranker_url}")
     
+    def _create_session(self, pool_size: int, max_retries: int) -> requests.Session:
+        """
+        Session with a connection pool and jittered retry/backoff on 5xx
+        and connection errors (scoring is idempotent, so POST is retried)
+        
+        Read errors are not retried: a request that hit the read timeout
+        would otherwise block for up to (max_retries + 1) x timeout.
+        """
+        retry_kwargs = dict(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=float(os.getenv("RERANK_RETRY_BACKOFF", "0.3")),
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False
+        )
+        try:
+            retry = Retry(backoff_jitter=0.2, **retry_kwargs)
+        except TypeError:
+            # urllib3 < 2 has no backoff_jitter
+            retry = Retry(**retry_kwargs)
+        
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        return session
+    
+    def close(self):
+        """Close pooled connections, the async client and loop, and stop the health probe"""
+        self._stop_probe.set()
+        self.session.close()
+        with self._loop_lock:
+            loop, thread = self._loop, self._loop_thread
+            self._loop = self._loop_thread = None
+        if loop is not None:
+            if self._async_client is not None:
+                asyncio.run_coroutine_threadsafe(self._async_client.aclose(), loop).result(timeout=5)
+                self._async_client = None
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
+    
+    def _new_async_client(self, max_concurrency: int) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(max_connections=max_concurrency),
+            transport=httpx.AsyncHTTPTransport(retries=2)
+        )
+    
+    def _run_async(self, coroutine):
+        """Run a coroutine on the reranker's background event loop and wait for it"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="rerank-async-loop", daemon=True
+                )
+                self._loop_thread.start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+    
+    def needs_concurrency(self, num_docs: int) -> bool:
+        """
+        Whether concurrent scoring would help: more than one /score request
+        is needed (several batches, or per-document requests because the
+        server rejects list input). A single batched request is faster sync.
+        """
+        if self.supports_list_input is False:
+            return num_docs > 1
+        return num_docs > self.batch_size
+    
+    def _record_success(self):
+        with self._breaker_lock:
+            self.consecutive_failures = 0
+            if self.breaker_open:
+                self.breaker_open = False
+                logger.info("✅ Reranker circuit closed")
+    
+    def _record_failure(self):
+        """Count a failed call; open the circuit after breaker_failures in a row"""
+        with self._breaker_lock:
+            self.consecutive_failures += 1
+            if self.breaker_open or self.consecutive_failures < self.breaker_failures:
+                return
+            self.breaker_open = True
+        
+        logger.error(f"🔌 Reranker circuit open after {self.consecutive_failures} consecutive failures; "
+                     f"probing /health every {self.breaker_probe_interval}s")
+        threading.Thread(target=self._probe_health, name="rerank-health-probe", daemon=True).start()
+    
+    def _probe_health(self):
+        """Background probe: close the circuit once the service is healthy again"""
+        while self.breaker_open and not self._stop_probe.wait(self.breaker_probe_interval):
+            if self.health_check():
+                self._record_success()
+    
+    def _record_outcome(self, attempted: int, scored: int):
+        """A call fails when it needed the service and got no score back"""
+        if attempted and not scored:
+            self._record_failure()
+        elif attempted:
+            self._record_success()
+    
     def rerank(
         self,
         query: str,
         documents: List[str],
         top_k: int = 5
     ) -> List[Tuple[int, float]]:
+        """Rerank documents (see rerank_detailed), returning (original_index, score) tuples"""
+        return self.rerank_detailed(query, documents, top_k=top_k).ranked
+    
+    def rerank_detailed(
+        self,
+        query: str,
+        documents: List[str],
+        top_k: int = 5
+    ) -> RerankResult:
         """
         Rerank documents using BGE Reranker
         
+        Cached scores are reused; the remaining documents are trimmed to
+        the model window (truncate_to_window) and scored batch_size at a
+        time with one /score request per batch (text_2 as a list); if the
+        server rejects list input (4xx or a malformed list payload), each
+        document is scored with its own request. A 5xx left after retries
+        or a connection error fails the whole call: the fallback ranking is
+        returned and one breaker failure is counted. While the circuit
+        breaker is open, no request is made and the fallback ranking is
+        returned.
+        
         Args:
             query: The search query
             documents: List of document texts to rerank
             top_k: Number of top documents to return
             
         Returns:
-            List of (original_index, score) tuples, sorted by score descending
+            RerankResult: (original_index, score) tuples sorted by score
+            descending, and the indices that got a fallback score
         """
         if not documents:
             logger.warning("No documents to rerank")
-            return []
+            return RerankResult([], set())
+        
+        if self.breaker_open:
+            logger.warning("Reranker circuit open, skipping /score")
+            return self._fallback_ranking(documents, top_k)
         
+        cache_hits = cache_misses = 0
         try:
-            # Prepare request payloads for vLLM score endpoint
-            # vLLM reranker expects pairwise comparisons: {"text_1": query, "text_2": document}
-            # We need to score each document individually
+            scores, keys = self._cached_scores(query, documents)
+            uncached = [idx for idx in range(len(documents)) if idx not in scores]
+            cache_hits, cache_misses = len(scores), len(uncached)
             
-            logger.info(f"Reranking {len(documents)} documents...")
+            logger.info(f"Reranking {len(uncached)} of {len(documents)} documents...")
+            payloads = self._truncate_documents(query, documents, uncached)
             
-            scores = []
-            score_url = f"{self.reranker_url}/score"
+            for start in range(0, len(uncached), self.batch_size):
+                batch_ids = uncached[start:start + self.batch_size]
+                batch = [payloads[idx] for idx in batch_ids]
+                batch_scores = None
+                if self.supports_list_input is not False:
+                    batch_scores = self._score_batch(query, batch)
+                if batch_scores is None:
+                    batch_scores = [
+                        self._score_single(query, doc, idx)
+                        for idx, doc in zip(batch_ids, batch)
+                    ]
+                for idx, score in zip(batch_ids, batch_scores):
+                    if score is not None:
+                        scores[idx] = score
+                        self.score_cache.put(keys[idx], score)
             
-            for idx, doc in enumerate(documents):
-                payload = {
-                    "model": self.model_name,
-                    "text_1": query,
-                    "text_2": doc
-                }
-                
-                logger.debug(f"Scoring document {idx+1}/{len(documents)}")
-                
-                response = requests.post(
-                    score_url,
-                    json=payload,
-                    timeout=self.timeout,
-                    headers={"Content-Type": "application/json"}
-                )
+            self._record_outcome(len(uncached), len(scores) - (len(documents) - len(uncached)))
+            fallback_ids = set(range(len(documents))) - set(scores)
             
-                if response.status_code != 200:
-                    logger.error(f"Reranker API error for doc {idx}: {response.status_code} - {response.text}")
-                    # Use fallback score for this document
-                    scores.append({"index": idx, "score": 0.5})
-                    continue
-                
-                # Parse response
-                result = response.json()
-                
-                # vLLM score endpoint returns:
-                # {"data": [{"index": 0, "object": "score", "score": 0.028...}], ...}
-                if isinstance(result, dict) and "data" in result:
-                    if isinstance(result["data"], list) and len(result["data"]) > 0:
-                        score_data = result["data"][0]
-                        if isinstance(score_data, dict) and "score" in score_data:
-                            score = float(score_data["score"])
-                        else:
-                            logger.warning(f"No score in data for doc {idx}: {score_data}")
-                            score = 0.5
-                    elif isinstance(result["data"], dict) and "score" in result["data"]:
-                        score = float(result["data"]["score"])
-                    else:
-                        logger.warning(f"Unexpected data format for doc {idx}: {result}")
-                        score = 0.5
-                elif isinstance(result, dict) and "score" in result:
-                    score = float(result["score"])
-                else:
-                    logger.warning(f"Unexpected response format for doc {idx}: {result}")
-                    score = 0.5
-                
-                scores.append({"index": idx, "score": score})
-            
-            # Sort by score descending
+            # Sort by score descending (0.5 for documents that failed)
             ranked = sorted(
-                [(s["index"], s["score"]) for s in scores],
+                ((idx, scores.get(idx, 0.5)) for idx in range(len(documents))),
                 key=lambda x: x[1],
                 reverse=True
             )[:top_k]
@@ -135,26 +436,172 @@ class BGEReranker:
             for idx, (orig_idx, score) in enumerate(ranked[:3]):
                 logger.debug(f"  {idx+1}. Doc {orig_idx}: {score:.4f}")
             
-            return ranked
+            return RerankResult(ranked, fallback_ids, cache_hits, cache_misses)
             
         except requests.exceptions.Timeout:
             logger.error(f"Reranker request timeout after {self.timeout}s")
-            return self._fallback_ranking(documents, top_k)
+            self._record_failure()
+            return self._fallback_ranking(documents, top_k, cache_hits, cache_misses)
             
         except requests.exceptions.ConnectionError as e:
             logger.error(f"Cannot connect to reranker service: {e}")
-            return self._fallback_ranking(documents, top_k)
+            self._record_failure()
+            return self._fallback_ranking(documents, top_k, cache_hits, cache_misses)
+            
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"Reranker service error: {e}")
+            self._record_failure()
+            return self._fallback_ranking(documents, top_k, cache_hits, cache_misses)
             
         except Exception as e:
             logger.error(f"Reranking error: {e}", exc_info=True)
-            return self._fallback_ranking(documents, top_k)
+            self._record_failure()
+            return self._fallback_ranking(documents, top_k, cache_hits, cache_misses)
+    
+    def _cached_scores(self, query: str, documents: List[str]) -> Tuple[Dict[int, float], List[tuple]]:
+        """
+        Look up cached scores
+        
+        Returns:
+            ({document index: cached score}, cache key per document)
+        """
+        query_hash = fingerprint_text(query)
+        keys = [(self.model_name, query_hash, fingerprint_text(doc)) for doc in documents]
+        scores = {}
+        for idx, key in enumerate(keys):
+            score = self.score_cache.get(key)
+            if score is not None:
+                scores[idx] = score
+        
+        stats = self.score_cache.stats()
+        logger.info(f"Rerank cache: {len(scores)}/{len(documents)} hits "
+                    f"(overall hit rate {stats['hit_rate']:.0%}, {stats['size']} entries)")
+        return scores, keys
+    
+    def _truncate_documents(self, query: str, documents: List[str], ids: List[int]) -> Dict[int, str]:
+        """
+        Trim the documents to be scored to the model window
+        
+        Returns:
+            {document index: text to send}
+        """
+        if not self.max_tokens:
+            return {idx: documents[idx] for idx in ids}
+        
+        payloads = {idx: truncate_to_window(query, documents[idx], self.max_tokens) for idx in ids}
+        original_chars = sum(len(documents[idx]) for idx in ids)
+        sent_chars = sum(len(text) for text in payloads.values())
+        if sent_chars < original_chars:
+            logger.info(f"Trimmed rerank payload to {self.max_tokens} tokens per pair: "
+                        f"{original_chars} → {sent_chars} chars")
+        return payloads
+    
+    def _score_batch(self, query: str, documents: List[str]) -> Optional[List[float]]:
+        """
+        Score several documents with one /score request
+        
+        Returns:
+            One score per document (mapped back by the response's index
+            field), or None if the server rejected or mis-answered list input
+            
+        Raises:
+            requests.HTTPError: on a 5xx left after retries (the service is
+            failing, so scoring per document would only multiply requests)
+        """
+        response = self.session.post(
+            f"{self.reranker_url}/score",
+            json={
+                "model": self.model_name,
+                "text_1": query,
+                "text_2": documents
+            },
+            timeout=self.timeouts
+        )
+        
+        if response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code != 200:
+            logger.warning(f"Batched /score failed ({response.status_code}), scoring per document")
+            if 400 <= response.status_code < 500:
+                self.supports_list_input = False
+            return None
+        
+        return self._parse_batch_scores(response.json(), len(documents))
+    
+    def _parse_batch_scores(self, result: Any, count: int) -> Optional[List[float]]:
+        """
+        Map a batched /score response back to document order
+        {"data": [{"index": i, "object": "score", "score": ...}, ...]}
+        """
+        data = result.get("data") if isinstance(result, dict) else None
+        scores = [None] * count
+        if isinstance(data, list):
+            for position, item in enumerate(data):
+                if not isinstance(item, dict) or "score" not in item:
+                    continue
+                idx = item.get("index", position)
+                if isinstance(idx, int) and 0 <= idx < count:
+                    scores[idx] = float(item["score"])
+        
+        if any(score is None for score in scores):
+            logger.warning(f"Batched /score returned an unexpected format, scoring per document: {result}")
+            self.supports_list_input = False
+            return None
+        
+        self.supports_list_input = True
+        return scores
+    
+    def _score_single(self, query: str, doc: str, idx: int) -> Optional[float]:
+        """Score one document with its own /score request (None on a 4xx or bad payload; raises on 5xx)"""
+        payload = {
+            "model": self.model_name,
+            "text_1": query,
+            "text_2": doc
+        }
+        
+        logger.debug(f"Scoring document {idx+1}")
+        
+        response = self.session.post(
+            f"{self.reranker_url}/score",
+            json=payload,
+            timeout=self.timeouts
+        )
+        
+        if response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code != 200:
+            logger.error(f"Reranker API error for doc {idx}: {response.status_code} - {response.text}")
+            # Caller uses the fallback score for this document
+            return None
+        
+        return self._parse_single_score(response.json(), idx)
+    
+    def _parse_single_score(self, result: Any, idx: int) -> Optional[float]:
+        """Parse a single-document /score response (None if unparseable)"""
+        # vLLM score endpoint returns:
+        # {"data": [{"index": 0, "object": "score", "score": 0.028...}], ...}
+        if isinstance(result, dict) and "data" in result:
+            if isinstance(result["data"], list) and len(result["data"]) > 0:
+                score_data = result["data"][0]
+                if isinstance(score_data, dict) and "score" in score_data:
+                    return float(score_data["score"])
+                logger.warning(f"No score in data for doc {idx}: {score_data}")
+                return None
+            if isinstance(result["data"], dict) and "score" in result["data"]:
+                return float(result["data"]["score"])
+            logger.warning(f"Unexpected data format for doc {idx}: {result}")
+            return None
+        if isinstance(result, dict) and "score" in result:
+            return float(result["score"])
+        logger.warning(f"Unexpected response format for doc {idx}: {result}")
+        return None
     
     def rerank_documents(
         self,
         query: str,
         documents: List[Dict[str, Any]],
         top_k: int = 5
-    ) -> List[Dict[str, Any]]:
+    ) -> RerankedDocuments:
         """
         Rerank a list of document dictionaries
         
@@ -164,64 +611,331 @@ class BGEReranker:
             top_k: Number of top documents to return
             
         Returns:
-            Reranked list of documents with updated scores
+            RerankedDocuments: reranked documents with updated scores and
+            this call's score-cache hits/misses
         """
         if not documents:
-            return []
+            return RerankedDocuments([])
         
         # Extract content
         doc_contents = [doc.get('content', '') for doc in documents]
         
         # Get reranking scores
-        ranked = self.rerank(query, doc_contents, top_k=top_k)
+        result = self.rerank_detailed(query, doc_contents, top_k=top_k)
+        
+        return RerankedDocuments(
+            self._apply_ranking(documents, result, top_k), result.cache_hits, result.cache_misses
+        )
+    
+    async def arerank_documents(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_k: int = 5,
+        deadline: float = None
+    ) -> RerankedDocuments:
+        """
+        Async variant of rerank_documents (see arerank)
+        
+        Args:
+            query: The search query
+            documents: List of document dicts with 'content' field
+            top_k: Number of top documents to return
+            deadline: Seconds allowed for the whole batch
+            
+        Returns:
+            RerankedDocuments: reranked documents with updated scores and
+            this call's score-cache hits/misses
+        """
+        if not documents:
+            return RerankedDocuments([])
         
-        if not ranked:
+        doc_contents = [doc.get('content', '') for doc in documents]
+        result = await self.arerank_detailed(query, doc_contents, top_k=top_k, deadline=deadline)
+        
+        return RerankedDocuments(
+            self._apply_ranking(documents, result, top_k), result.cache_hits, result.cache_misses
+        )
+    
+    def rerank_documents_concurrent(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_k: int = 5,
+        deadline: float = None
+    ) -> RerankedDocuments:
+        """
+        Sync entry point for arerank_documents, run on the background loop
+        with the long-lived AsyncClient (safe to call from inside another
+        event loop)
+        """
+        return self._run_async(self.arerank_documents(query, documents, top_k=top_k, deadline=deadline))
+    
+    def rerank_concurrent(
+        self,
+        query: str,
+        documents: List[str],
+        top_k: int = 5,
+        deadline: float = None
+    ) -> List[Tuple[int, float]]:
+        """Sync entry point for arerank, run on the background loop"""
+        return self._run_async(self.arerank(query, documents, top_k=top_k, deadline=deadline))
+    
+    def _apply_ranking(
+        self,
+        documents: List[Dict[str, Any]],
+        result: RerankResult,
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """Copy documents in ranked order with rerank scores and ranks"""
+        if not result.ranked:
             # Fallback: return original top_k
             return documents[:top_k]
         
         # Build reranked document list
         reranked_docs = []
-        for rank, (orig_idx, score) in enumerate(ranked, start=1):
+        for rank, (orig_idx, score) in enumerate(result.ranked, start=1):
             if orig_idx < len(documents):
                 doc = documents[orig_idx].copy()
                 doc['rerank_score'] = float(score)
                 doc['original_rank'] = orig_idx + 1
                 doc['new_rank'] = rank
+                # Synthetic score (reranker failed for this document)
+                doc['rerank_fallback'] = orig_idx in result.fallback_ids
                 # Update main score to rerank score
                 doc['score'] = float(score)
                 reranked_docs.append(doc)
         
         return reranked_docs
     
-    def _fallback_ranking(self, documents: List[str], top_k: int) -> List[Tuple[int, float]]:
+    async def arerank(
+        self,
+        query: str,
+        documents: List[str],
+        top_k: int = 5,
+        deadline: float = None
+    ) -> List[Tuple[int, float]]:
+        """Rerank documents concurrently (see arerank_detailed), returning (original_index, score) tuples"""
+        return (await self.arerank_detailed(query, documents, top_k=top_k, deadline=deadline)).ranked
+    
+    async def arerank_detailed(
+        self,
+        query: str,
+        documents: List[str],
+        top_k: int = 5,
+        deadline: float = None
+    ) -> RerankResult:
+        """
+        Rerank documents with concurrent /score requests (httpx.AsyncClient)
+        
+        Batches (or, if the server rejects list input, single documents)
+        are scored concurrently, at most max_concurrency requests at a
+        time. Documents not scored when the deadline for the whole batch
+        expires get the fallback score 0.5 instead of stalling the caller.
+        
+        Args:
+            query: The search query
+            documents: List of document texts to rerank
+            top_k: Number of top documents to return
+            deadline: Seconds allowed for the whole batch (env RERANK_DEADLINE, default 10)
+            
+        Returns:
+            RerankResult: (original_index, score) tuples sorted by score
+            descending, and the indices that got a fallback score
+        """
+        if not documents:
+            logger.warning("No documents to rerank")
+            return RerankResult([], set())
+        
+        if self.breaker_open:
+            logger.warning("Reranker circuit open, skipping /score")
+            return self._fallback_ranking(documents, top_k)
+        
+        deadline = deadline or float(os.getenv("RERANK_DEADLINE", "10"))
+        max_concurrency = int(os.getenv("RERANK_MAX_CONCURRENCY", "8"))
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        scores, keys = self._cached_scores(query, documents)
+        cached_ids = set(scores)
+        uncached = [idx for idx in range(len(documents)) if idx not in cached_ids]
+        cache_hits, cache_misses = len(cached_ids), len(uncached)
+        
+        logger.info(f"Reranking {len(uncached)} of {len(documents)} documents "
+                    f"(async, concurrency {max_concurrency})...")
+        
+        payloads = self._truncate_documents(query, documents, uncached)
+        
+        # On the background loop the long-lived client is reused; callers
+        # running their own event loop get a client for this call only
+        on_own_loop = asyncio.get_running_loop() is self._loop
+        if on_own_loop:
+            if self._async_client is None:
+                self._async_client = self._new_async_client(max_concurrency)
+            client = self._async_client
+        else:
+            client = self._new_async_client(max_concurrency)
+        
+        try:
+            tasks = [
+                asyncio.ensure_future(self._ascore_batch(
+                    client, semaphore, query, payloads,
+                    uncached[start:start + self.batch_size], scores
+                ))
+                for start in range(0, len(uncached), self.batch_size)
+            ]
+            if tasks:
+                done, pending = await asyncio.wait(tasks, timeout=deadline)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+                for task in done:
+                    if task.exception() is not None:
+                        logger.error(f"Async reranking error: {task.exception()}")
+        finally:
+            if not on_own_loop:
+                await client.aclose()
+        
+        for idx, score in scores.items():
+            if idx not in cached_ids:
+                self.score_cache.put(keys[idx], score)
+        self._record_outcome(len(uncached), len(scores) - len(cached_ids))
+        fallback_ids = set(range(len(documents))) - set(scores)
+        
+        if not scores:
+            logger.error(f"No documents scored within {deadline}s")
+            return self._fallback_ranking(documents, top_k, cache_hits, cache_misses)
+        
+        missing = len(documents) - len(scores)
+        if missing:
+            logger.warning(f"{missing} documents not scored (errors or {deadline}s deadline), "
+                           f"using fallback scores")
+        
+        ranked = sorted(
+            ((idx, scores.get(idx, 0.5)) for idx in range(len(documents))),
+            key=lambda x: x[1],
+            reverse=True
+        )[:top_k]
+        
+        logger.info(f"✅ Reranked to top {len(ranked)} documents")
+        return RerankResult(ranked, fallback_ids, cache_hits, cache_misses)
+    
+    async def _ascore_batch(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        query: str,
+        payloads: Dict[int, str],
+        batch_ids: List[int],
+        scores: Dict[int, float]
+    ):
+        """Score one batch into scores (by original index), per document if lists are rejected"""
+        batch = [payloads[idx] for idx in batch_ids]
+        if self.supports_list_input is not False:
+            async with semaphore:
+                response = await client.post(
+                    f"{self.reranker_url}/score",
+                    json={"model": self.model_name, "text_1": query, "text_2": batch}
+                )
+            if response.status_code >= 500:
+                # Service failure, not a list-input problem: the batch keeps
+                # its fallback scores instead of fanning out per document
+                response.raise_for_status()
+            if response.status_code == 200:
+                batch_scores = self._parse_batch_scores(response.json(), len(batch))
+                if batch_scores is not None:
+                    for idx, score in zip(batch_ids, batch_scores):
+                        scores[idx] = score
+                    return
+            else:
+                logger.warning(f"Batched /score failed ({response.status_code}), scoring per document")
+                if 400 <= response.status_code < 500:
+                    self.supports_list_input = False
+        
+        await asyncio.gather(*(
+            self._ascore_single(client, semaphore, query, doc, idx, scores)
+            for idx, doc in zip(batch_ids, batch)
+        ))
+    
+    async def _ascore_single(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        query: str,
+        doc: str,
+        idx: int,
+        scores: Dict[int, float]
+    ):
+        async with semaphore:
+            try:
+                response = await client.post(
+                    f"{self.reranker_url}/score",
+                    json={"model": self.model_name, "text_1": query, "text_2": doc}
+                )
+            except httpx.HTTPError as e:
+                logger.error(f"Reranker request error for doc {idx}: {e}")
+                return
+        
+        if response.status_code != 200:
+            logger.error(f"Reranker API error for doc {idx}: {response.status_code} - {response.text}")
+            return
+        score = self._parse_single_score(response.json(), idx)
+        if score is not None:
+            scores[idx] = score
+    
+    def _fallback_ranking(
+        self,
+        documents: List[str],
+        top_k: int,
+        cache_hits: int = 0,
+        cache_misses: int = 0
+    ) -> RerankResult:
         """
         Fallback ranking when reranker is unavailable
         Returns original order with synthetic scores
         """
         logger.warning("Using fallback ranking (original order)")
-        return [(i, 1.0 - (i * 0.1)) for i in range(min(top_k, len(documents)))]
+        ranked = [(i, 1.0 - (i * 0.1)) for i in range(min(top_k, len(documents)))]
+        return RerankResult(ranked, set(range(len(documents))), cache_hits, cache_misses)
     
     def health_check(self) -> bool:
         """
         Check if reranker service is healthy
         
+        The result is cached in last_health as (healthy, checked_at)
+        
         Returns:
             True if service is available, False otherwise
         """
         try:
             health_url = f"{self.reranker_url}/health"
-            response = requests.get(health_url, timeout=5)
+            response = self.session.get(health_url, timeout=(self.connect_timeout, 5))
             
             if response.status_code == 200:
                 logger.info("✅ BGE Reranker service is healthy")
-                return True
+                healthy = True
             else:
                 logger.warning(f"⚠️ BGE Reranker health check failed: {response.status_code}")
-                return False
+                healthy = False
                 
         except Exception as e:
             logger.error(f"❌ BGE Reranker service unavailable: {e}")
+            healthy = False
+        
+        self.last_health = (healthy, time.time())
+        return healthy
+    
+    def is_available(self, max_age: float = 60.0) -> bool:
+        """
+        Cached availability (no network call): False while the circuit is
+        open or when the last health check within max_age seconds failed
+        """
+        if self.breaker_open:
             return False
+        if self.last_health is None:
+            return True
+        healthy, checked_at = self.last_health
+        return healthy or time.time() - checked_at > max_age
 
 
 def test_bge_reranker():
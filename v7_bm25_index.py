@@ -0,0 +1,507 @@
+"""
+AI Troubleshooter v7 - Incremental BM25 Index
+BM25 Okapi over a document set that changes between collection cycles:
+documents are added and removed individually, and document frequencies,
+average length and the inverted index are kept current, so an update
+costs O(size of the changed documents) instead of a full rebuild
+
+Indexes can be saved to a versioned snapshot file and reopened read-only
+via mmap (BM25Snapshot), so the collector survives restarts and other
+processes can share one index without rebuilding it
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class IncrementalBM25:
+    """
+    Incremental BM25 Okapi index
+
+    Scores match rank_bm25.BM25Okapi (same k1, b, epsilon and idf floor).
+    Doc ids are integer slots; removed slots are reused by later adds.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        """
+        Initialize an empty index
+
+        Args:
+            k1: Term-frequency saturation
+            b: Length normalization
+            epsilon: Floor for negative idf, as a fraction of the average idf
+        """
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        self.postings: Dict[str, Dict[int, int]] = {}  # term -> {doc_id: tf}
+        self.doc_term_freqs: List[Optional[Dict[str, int]]] = []
+        self.doc_lengths: List[int] = []
+        self.free_slots: List[int] = []
+        self.num_docs = 0
+        self.total_length = 0
+
+        # idf depends on num_docs, so it is recomputed lazily after changes
+        self._idf: Dict[str, float] = {}
+        self._idf_dirty = False
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_length / self.num_docs if self.num_docs else 0.0
+
+    def doc_ids(self) -> List[int]:
+        """Sorted ids of all live documents"""
+        return [i for i, tf in enumerate(self.doc_term_freqs) if tf is not None]
+
+    def add(self, tokens: List[str]) -> int:
+        """
+        Add a tokenized document
+
+        Returns:
+            The new document's id
+        """
+        term_freqs = dict(Counter(tokens))
+
+        if self.free_slots:
+            doc_id = self.free_slots.pop()
+            self.doc_term_freqs[doc_id] = term_freqs
+            self.doc_lengths[doc_id] = len(tokens)
+        else:
+            doc_id = len(self.doc_term_freqs)
+            self.doc_term_freqs.append(term_freqs)
+            self.doc_lengths.append(len(tokens))
+
+        for term, tf in term_freqs.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+        self.num_docs += 1
+        self.total_length += len(tokens)
+        self._idf_dirty = True
+        return doc_id
+
+    def remove(self, doc_id: int):
+        """Remove a document by id (its slot is reused by a later add)"""
+        term_freqs = self.doc_term_freqs[doc_id]
+        if term_freqs is None:
+            raise KeyError(f"Document {doc_id} is not in the index")
+
+        for term in term_freqs:
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+
+        self.num_docs -= 1
+        self.total_length -= self.doc_lengths[doc_id]
+        self.doc_term_freqs[doc_id] = None
+        self.doc_lengths[doc_id] = 0
+        self.free_slots.append(doc_id)
+        self._idf_dirty = True
+
+    def _refresh_idf(self):
+        idf = {}
+        idf_sum = 0.0
+        negative = []
+        for term, docs in self.postings.items():
+            df = len(docs)
+            value = math.log(self.num_docs - df + 0.5) - math.log(df + 0.5)
+            idf[term] = value
+            idf_sum += value
+            if value < 0:
+                negative.append(term)
+
+        floor = self.epsilon * (idf_sum / len(idf)) if idf else 0.0
+        for term in negative:
+            idf[term] = floor
+
+        self._idf = idf
+        self._idf_dirty = False
+
+    def idf(self, term: str) -> float:
+        if self._idf_dirty:
+            self._refresh_idf()
+        return self._idf.get(term, 0.0)
+
+    def get_scores(self, query_tokens: List[str], doc_ids: Optional[List[int]] = None) -> List[float]:
+        """
+        BM25 scores for a tokenized query
+
+        Args:
+            query_tokens: Query tokens (repeated tokens count repeatedly)
+            doc_ids: Documents to score (default: all live docs, in doc_ids() order)
+
+        Returns:
+            One score per doc id, aligned with doc_ids
+        """
+        if doc_ids is None:
+            doc_ids = self.doc_ids()
+        if not doc_ids:
+            return []
+
+        avgdl = self.avgdl
+        position = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+        scores = [0.0] * len(doc_ids)
+
+        # Term-at-a-time over postings: only documents containing a query
+        # term are touched
+        for term in query_tokens:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf(term)
+            if len(docs) > len(position):
+                pairs = ((doc_id, docs.get(doc_id)) for doc_id in position)
+            else:
+                pairs = docs.items()
+            for doc_id, tf in pairs:
+                i = position.get(doc_id)
+                if i is None or not tf:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avgdl)
+                scores[i] += idf * (tf * (self.k1 + 1) / (tf + norm))
+
+        return scores
+
+
+# ----------------------------------------------------------------------
+# Persistent snapshot
+# ----------------------------------------------------------------------
+#
+# File layout (little-endian):
+#   magic (8 bytes) | version (uint32) | header length (uint32) | header JSON
+#   followed by flat arrays, each starting on an 8-byte boundary. The header
+#   records every array's dtype, offset and length, so opening a snapshot is
+#   an mmap plus zero-copy np.frombuffer views.
+#
+# Arrays (doc ids are compacted to 0..num_docs-1 on save):
+#   vocab_offsets / vocab_blob       sorted terms (UTF-8), binary-searched
+#   idf                              per-term idf (float64)
+#   term_offsets                     postings range per term (CSR)
+#   postings_docs / postings_tfs     doc id and tf per posting
+#   doc_lengths                      tokens per document
+#   content_offsets / content_blob   document text (UTF-8)
+#   metadata_offsets / metadata_blob document metadata (JSON)
+
+SNAPSHOT_MAGIC = b"BM25SNAP"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ALIGNMENT = 8
+
+
+def _encode_blob(items: List[bytes]):
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in items], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(items), dtype=np.uint8)
+
+
+def save_bm25_snapshot(
+    index: IncrementalBM25,
+    path: str,
+    contents: List[Optional[str]],
+    metadata: List[Optional[Dict[str, Any]]],
+    extra: Optional[Dict[str, Any]] = None
+):
+    """
+    Write an index and its documents to a versioned snapshot file
+
+    The file is written to a temporary name and renamed into place, so
+    readers that already mmap the old snapshot are unaffected.
+
+    Args:
+        index: Index to save
+        path: Snapshot file path
+        contents: Document text by doc id (None for free slots)
+        metadata: Document metadata by doc id (None for free slots)
+        extra: JSON-serializable values stored in the header
+    """
+    live_ids = index.doc_ids()
+    new_id = {doc_id: i for i, doc_id in enumerate(live_ids)}
+
+    terms = sorted(index.postings)
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum([len(index.postings[t]) for t in terms], out=term_offsets[1:])
+    postings_docs = np.empty(int(term_offsets[-1]), dtype=np.int32)
+    postings_tfs = np.empty(int(term_offsets[-1]), dtype=np.int32)
+    for term_id, term in enumerate(terms):
+        docs = sorted((new_id[d], tf) for d, tf in index.postings[term].items())
+        lo, hi = term_offsets[term_id], term_offsets[term_id + 1]
+        postings_docs[lo:hi] = [d for d, _ in docs]
+        postings_tfs[lo:hi] = [tf for _, tf in docs]
+
+    vocab_offsets, vocab_blob = _encode_blob([t.encode("utf-8") for t in terms])
+    content_offsets, content_blob = _encode_blob(
+        [(contents[d] or "").encode("utf-8") for d in live_ids]
+    )
+    metadata_offsets, metadata_blob = _encode_blob(
+        [json.dumps(metadata[d] or {}, default=str).encode("utf-8") for d in live_ids]
+    )
+
+    arrays = {
+        "vocab_offsets": vocab_offsets,
+        "vocab_blob": vocab_blob,
+        "idf": np.array([index.idf(t) for t in terms], dtype=np.float64),
+        "term_offsets": term_offsets,
+        "postings_docs": postings_docs,
+        "postings_tfs": postings_tfs,
+        "doc_lengths": np.array([index.doc_lengths[d] for d in live_ids], dtype=np.int32),
+        "content_offsets": content_offsets,
+        "content_blob": content_blob,
+        "metadata_offsets": metadata_offsets,
+        "metadata_blob": metadata_blob,
+    }
+
+    # Header size depends on the offsets it records, so lay out arrays
+    # relative to the (aligned) end of the header and fix up afterwards
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "offset": position, "length": int(array.size)}
+        position += -(-array.nbytes // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+    header = {
+        "num_docs": len(live_ids),
+        "num_terms": len(terms),
+        "total_length": index.total_length,
+        "k1": index.k1,
+        "b": index.b,
+        "epsilon": index.epsilon,
+        "extra": extra or {},
+        "arrays": layout,
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = len(SNAPSHOT_MAGIC) + 8 + len(header_bytes)
+    data_start = -(-data_start // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+    for entry in layout.values():
+        entry["offset"] += data_start
+    header_bytes = json.dumps(header).encode("utf-8")
+    # Rewriting offsets may grow the header past the reserved space
+    while len(SNAPSHOT_MAGIC) + 8 + len(header_bytes) > data_start:
+        for entry in layout.values():
+            entry["offset"] += SNAPSHOT_ALIGNMENT
+        data_start += SNAPSHOT_ALIGNMENT
+        header_bytes = json.dumps(header).encode("utf-8")
+
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<II", SNAPSHOT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.write(b"\0" * (layout[name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+class _BlobSequence:
+    """Read-only sequence view over an offsets + blob pair"""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray, decode):
+        self.offsets = offsets
+        self.blob = blob
+        self.decode = decode
+
+    def __len__(self) -> int:
+        self._check_open()
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int):
+        self._check_open()
+        return self.decode(self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes())
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def _check_open(self):
+        if self.blob is None:
+            raise ValueError("BM25 snapshot is closed")
+
+    def release(self):
+        """Drop the views into the snapshot mmap (holders see a closed sequence)"""
+        self.offsets = None
+        self.blob = None
+
+
+class BM25Snapshot:
+    """
+    Read-only BM25 index backed by a memory-mapped snapshot file
+
+    Same scoring interface as IncrementalBM25 (get_scores, doc_ids,
+    __len__, avgdl), so HybridRetriever can use either. Several processes
+    can map one snapshot and share its pages.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open a snapshot
+
+        Args:
+            path: Snapshot file written by save_bm25_snapshot
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic = self._mmap[:len(SNAPSHOT_MAGIC)]
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a BM25 snapshot")
+        version, header_length = struct.unpack_from("<II", self._mmap, len(SNAPSHOT_MAGIC))
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported BM25 snapshot version {version} (expected {SNAPSHOT_VERSION})")
+        header_start = len(SNAPSHOT_MAGIC) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_length])
+
+        self.num_docs = header["num_docs"]
+        self.num_terms = header["num_terms"]
+        self.total_length = header["total_length"]
+        self.k1 = header["k1"]
+        self.b = header["b"]
+        self.epsilon = header["epsilon"]
+        self.extra = header["extra"]
+
+        for name, entry in header["arrays"].items():
+            setattr(self, name, np.frombuffer(
+                self._mmap, dtype=np.dtype(entry["dtype"]),
+                count=entry["length"], offset=entry["offset"]
+            ))
+
+        self.contents = _BlobSequence(
+            self.content_offsets, self.content_blob, lambda b: b.decode("utf-8")
+        )
+        self.metadata = _BlobSequence(
+            self.metadata_offsets, self.metadata_blob, lambda b: json.loads(b.decode("utf-8"))
+        )
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_length / self.num_docs if self.num_docs else 0.0
+
+    def doc_ids(self) -> List[int]:
+        return list(range(self.num_docs))
+
+    def term(self, term_id: int) -> str:
+        lo, hi = self.vocab_offsets[term_id], self.vocab_offsets[term_id + 1]
+        return self.vocab_blob[lo:hi].tobytes().decode("utf-8")
+
+    def term_id(self, term: str) -> Optional[int]:
+        """Binary search the sorted vocabulary (no dict is built on open)"""
+        target = term.encode("utf-8")
+        lo, hi = 0, self.num_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start, end = self.vocab_offsets[mid], self.vocab_offsets[mid + 1]
+            candidate = self.vocab_blob[start:end].tobytes()
+            if candidate < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.num_terms and self.term(lo) == term:
+            return lo
+        return None
+
+    def idf_of(self, term: str) -> float:
+        term_id = self.term_id(term)
+        return float(self.idf[term_id]) if term_id is not None else 0.0
+
+    def get_scores(self, query_tokens: List[str], doc_ids: Optional[List[int]] = None) -> List[float]:
+        """BM25 scores for a tokenized query (same semantics as IncrementalBM25)"""
+        if doc_ids is None:
+            doc_ids = self.doc_ids()
+        if not doc_ids:
+            return []
+
+        scores = np.zeros(self.num_docs, dtype=np.float64)
+        for term in query_tokens:
+            term_id = self.term_id(term)
+            if term_id is None:
+                continue
+            lo, hi = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = self.postings_docs[lo:hi]
+            tfs = self.postings_tfs[lo:hi].astype(np.float64)
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avgdl)
+            scores[docs] += self.idf[term_id] * (tfs * (self.k1 + 1) / (tfs + norm))
+
+        return scores[np.asarray(doc_ids, dtype=np.int64)].tolist()
+
+    def to_incremental(self) -> IncrementalBM25:
+        """Rebuild a mutable IncrementalBM25 (doc ids are preserved)"""
+        index = IncrementalBM25(k1=self.k1, b=self.b, epsilon=self.epsilon)
+        index.doc_term_freqs = [{} for _ in range(self.num_docs)]
+        index.doc_lengths = self.doc_lengths.tolist()
+        for term_id in range(self.num_terms):
+            term = self.term(term_id)
+            lo, hi = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+            docs = dict(zip(self.postings_docs[lo:hi].tolist(), self.postings_tfs[lo:hi].tolist()))
+            index.postings[term] = docs
+            for doc_id, tf in docs.items():
+                index.doc_term_freqs[doc_id][term] = tf
+        index.num_docs = self.num_docs
+        index.total_length = self.total_length
+        index._idf_dirty = True
+        return index
+
+    def close(self):
+        """
+        Release the memory map
+
+        contents / metadata sequences handed out earlier are released too
+        (their views would otherwise keep the mmap exported); they raise
+        ValueError if used afterwards.
+        """
+        if self._mmap.closed:
+            return
+        for name in list(vars(self)):
+            value = getattr(self, name)
+            if isinstance(value, _BlobSequence):
+                value.release()
+            if isinstance(value, (np.ndarray, _BlobSequence)):
+                setattr(self, name, None)
+        self._mmap.close()
+
+
+def test_bm25_snapshot():
+    """Round-trip a snapshot, then close it while sequences are still held"""
+    import tempfile
+
+    contents = ["pod web-1 OOMKilled exit code 137", "pod api-2 ImagePullBackOff", "pod db-3 ready"]
+    metadata = [{"pod_name": f"pod-{i}"} for i in range(len(contents))]
+    index = IncrementalBM25()
+    for content in contents:
+        index.add(content.lower().split())
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "bm25.snap")
+        save_bm25_snapshot(index, path, contents, metadata)
+
+        snapshot = BM25Snapshot(path)
+        held_contents, held_metadata = snapshot.contents, snapshot.metadata
+        query = ["oomkilled", "pod"]
+        assert np.allclose(snapshot.get_scores(query), index.get_scores(query))
+        assert list(held_contents) == contents and list(held_metadata) == metadata
+
+        snapshot.close()
+        snapshot.close()
+        try:
+            held_contents[0]
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("closed snapshot sequence is still readable")
+
+    print("✅ BM25 snapshot round-trip and close OK")
+
+
+if __name__ == "__main__":
+    test_bm25_snapshot()
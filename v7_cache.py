@@ -0,0 +1,115 @@
+"""
+AI Troubleshooter v7 - Caching Utilities
+Bounded LRU cache with TTL plus helpers for building cache keys
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUTTLCache:
+    """
+    Thread-safe LRU cache with optional time-to-live
+
+    Entries are evicted least-recently-used first once max_entries is
+    reached, and treated as missing once older than ttl_seconds.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: Optional[float] = None):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of entries (0 disables caching)
+            ttl_seconds: Entry lifetime in seconds (None = no expiry)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default on miss/expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entry if full"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for cache keys
+    Lowercases, collapses whitespace and drops trailing punctuation, so
+    "Why is my pod failing?" and "why is my pod  failing" share a key
+    """
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip(" ?!.")
+
+
+def fingerprint_text(*parts: str) -> str:
+    """Stable content hash of one or more strings"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8", errors="replace"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Shared retrieval-result cache (retrievers are rebuilt per query, so the
+# cache lives at module level and is keyed by corpus fingerprint)
+_retrieval_cache = None
+
+
+def get_retrieval_cache() -> LRUTTLCache:
+    """Get or create the process-wide retrieval-result cache"""
+    global _retrieval_cache
+    if _retrieval_cache is None:
+        _retrieval_cache = LRUTTLCache(
+            max_entries=int(os.getenv("RETRIEVAL_CACHE_SIZE", "128")),
+            ttl_seconds=float(os.getenv("RETRIEVAL_CACHE_TTL", "300"))
+        )
+    return _retrieval_cache
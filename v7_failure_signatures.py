@@ -0,0 +1,110 @@
+"""
+AI Troubleshooter v7 - Failure Signatures
+Well-known Kubernetes failure signatures (OOMKilled, ImagePullBackOff,
+missing configmaps, exit code 137, ...) compiled into one regex with a
+named group per signature, so a log buffer is scanned in a single pass.
+Chunks containing a signature are pinned to the top of the retrieval
+candidates with their labels.
+"""
+
+import bisect
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+# label -> pattern (one named group each in the combined regex)
+FAILURE_SIGNATURES: Dict[str, str] = {
+    "oom_killed": r"\bOOMKilled\b|\bOut of memory: Killed process\b",
+    "exit_code_137": r"\bexit(?:ed with)?\s*code\s*:?\s*137\b|\"exitCode\":\s*137\b",
+    "image_pull_backoff": r"\bImagePullBackOff\b|\bErrImagePull\b",
+    "crash_loop_backoff": r"\bCrashLoopBackOff\b|\bBack-off restarting failed container\b",
+    "configmap_not_found": r"\bconfigmaps? \"[^\"]+\" not found",
+    "secret_not_found": r"\bsecrets? \"[^\"]+\" not found",
+    "pvc_not_found": r"\bpersistentvolumeclaims? \"[^\"]+\" not found",
+    "create_container_config_error": r"\bCreateContainerConfigError\b",
+    "failed_scheduling": r"\bFailedScheduling\b|\b\d+ Insufficient (?:cpu|memory)\b",
+    "failed_mount": r"\bFailedMount\b|\bMountVolume\.SetUp failed\b",
+    "probe_failed": r"\b(?:Liveness|Readiness|Startup) probe failed\b",
+}
+
+SIGNATURE_PATTERN = re.compile(
+    "|".join(f"(?P<{label}>{pattern})" for label, pattern in FAILURE_SIGNATURES.items()),
+    re.IGNORECASE
+)
+
+
+class SignatureMatch(NamedTuple):
+    label: str
+    start: int
+    end: int
+    text: str
+
+
+def scan_signatures(text: str) -> List[SignatureMatch]:
+    """
+    Find all failure signatures in a log buffer (single pass)
+
+    Args:
+        text: Raw log text
+
+    Returns:
+        Matches in text order
+    """
+    return [
+        SignatureMatch(match.lastgroup, match.start(), match.end(), match.group())
+        for match in SIGNATURE_PATTERN.finditer(text)
+    ]
+
+
+def text_signatures(text: str) -> List[str]:
+    """Distinct signature labels in a piece of text (e.g. one chunk), in first-occurrence order"""
+    return list(dict.fromkeys(match.lastgroup for match in SIGNATURE_PATTERN.finditer(text)))
+
+
+def chunk_signatures(
+    matches: List[SignatureMatch],
+    start_index: int,
+    length: int,
+    starts: Optional[List[int]] = None
+) -> List[str]:
+    """
+    Labels of the matches starting inside one chunk
+
+    Args:
+        matches: Output of scan_signatures (sorted by start)
+        start_index: Chunk offset in the scanned text (TextSplitter add_start_index)
+        length: Chunk length
+        starts: [m.start for m in matches], computed once per scan when
+                labelling many chunks
+
+    Returns:
+        Distinct labels in first-occurrence order
+    """
+    if starts is None:
+        starts = [m.start for m in matches]
+    lo = bisect.bisect_left(starts, start_index)
+    hi = bisect.bisect_left(starts, start_index + length)
+    return list(dict.fromkeys(m.label for m in matches[lo:hi]))
+
+
+def select_pinned_chunks(chunk_labels: List[List[str]], limit: int = 3) -> List[int]:
+    """
+    Choose which labelled chunks to pin
+
+    Each signature is represented by the last chunk containing it (the
+    most recent occurrence); chunks covering more signatures come first.
+
+    Args:
+        chunk_labels: Signature labels per chunk, in chunk order
+        limit: Maximum number of chunks to pin
+
+    Returns:
+        Chunk positions to pin, in pin order
+    """
+    latest: Dict[str, int] = {}
+    for position, labels in enumerate(chunk_labels):
+        for label in labels:
+            latest[label] = position
+
+    chosen = list(dict.fromkeys(latest.values()))
+    chosen.sort(key=lambda position: (-len(chunk_labels[position]), position))
+    return chosen[:limit]
@@ -156,7 +156,8 @@ def test_edge_decisions():
         "max_iterations": 3,
         "transformation_history": [],
         "timestamp": "",
-        "data_source": ""
+        "data_source": "",
+        "analysis_metadata": {}
     }
     
     decision1 = Edge.decide_to_generate(state1)
@@ -5,11 +5,16 @@ UPDATED: Agent 1 now uses NVIDIA-style hybrid retrieval (FAISS, no Milvus)
 """
 
 import os
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 from llama_stack_client import LlamaStackClient
 from v7_state_schema import GraphState
 from k8s_hybrid_retriever import K8sHybridRetriever  # NVIDIA-style retriever
+from k8s_streaming_retriever import StreamingHybridRetriever, iter_lines
+from k8s_log_time_index import filter_log_window
 from v7_bge_reranker import BGEReranker
+from v7_cache import fingerprint_text
 import json
 
 
@@ -28,6 +33,36 @@ class Nodes:
         reranker_url: str = None
     ):
         """Initialize nodes with Llama Stack client"""
+        # Log contexts above this size use the disk-backed streaming retriever
+        self.streaming_threshold_chars = int(
+            float(os.getenv("STREAMING_RETRIEVER_THRESHOLD_MB", "64")) * 1024 * 1024
+        )
+        # Reranking is skipped when retrieval is already decisive: few
+        # candidates, or a top candidate whose fused RRF score leads the
+        # runner-up by this fraction
+        self.rerank_skip_max_docs = int(os.getenv("RERANK_SKIP_MAX_DOCS", "3"))
+        self.rerank_skip_rrf_margin = float(os.getenv("RERANK_SKIP_RRF_MARGIN", "0.4"))
+        # "per_document" (one LLM call per document), "parallel" (per-document
+        # calls, grading_max_concurrency at a time) or "batched" (all
+        # documents in one call, per-document if the verdicts don't parse)
+        self.grading_mode = os.getenv("GRADING_MODE", "per_document")
+        self.grading_max_concurrency = int(os.getenv("GRADING_MAX_CONCURRENCY", "4"))
+        # Per-call timeout; a timed-out grade counts as 0.5 (assumed relevant)
+        self.grading_timeout = float(os.getenv("GRADING_TIMEOUT", "30"))
+        # Grades are cached per run by document hash; the verdict hardly
+        # depends on how the question is phrased, so rewrites reuse it
+        # unless this is set
+        self.grade_cache_by_question = os.getenv("GRADE_CACHE_BY_QUESTION", "false").lower() == "true"
+        # Documents with a BGE score at or above the accept threshold are
+        # relevant without an LLM call. Rejecting below a threshold is off by
+        # default (0): a low cross-encoder score on a terse log line is not
+        # proof of irrelevance, and a wrong reject drops real evidence
+        self.grading_accept_score = float(os.getenv("GRADING_ACCEPT_SCORE", "0.8"))
+        self.grading_reject_score = float(os.getenv("GRADING_REJECT_SCORE", "0"))
+        # Per-document grading stops once this many relevant documents (or
+        # this much rerank score mass) are confirmed; 0 disables each
+        self.grading_early_exit_count = int(os.getenv("GRADING_EARLY_EXIT_COUNT", "0"))
+        self.grading_early_exit_mass = float(os.getenv("GRADING_EARLY_EXIT_SCORE_MASS", "0"))
         self.llama_client = LlamaStackClient(base_url=llama_stack_url)
         self.llama_model = llama_model
         self.llama_stack_url = llama_stack_url
@@ -55,28 +90,47 @@ class Nodes:
         log_context = state.get("log_context", "")
         pod_events = state.get("pod_events", "")
         
+        # Only index log lines inside the requested time window
+        # (untimestamped sections such as pod describe output are kept)
+        time_window = state.get("time_window")
+        windowed_context = filter_log_window(log_context, time_window)
+        if len(windowed_context) != len(log_context):
+            print(f"⏱️  Time window {time_window} min: {len(log_context)} → {len(windowed_context)} chars")
+        log_context = windowed_context
+        
         # Combine logs and events
-        combined_logs = log_context
-        if pod_events:
-            combined_logs = f"{log_context}\n\n=== Pod Events ===\n{pod_events}"
+        events_section = f"\n\n=== Pod Events ===\n{pod_events}" if pod_events else ""
+        combined_size = len(log_context) + len(events_section)
         
-        if not combined_logs or len(combined_logs) < 50:
+        if combined_size < 50:
             print("⚠️  No log context provided, retrieval will be limited")
             return {
                 "retrieved_docs": [],
                 "question": question
             }
         
-        print(f"📊 Log context size: {len(combined_logs)} chars")
+        print(f"📊 Log context size: {combined_size} chars")
         
         # NVIDIA APPROACH: Create fresh retriever with current logs
         # This builds BM25 + FAISS indexes automatically
         print("🏗️  Building NVIDIA-style retriever (BM25 + FAISS)...")
+        retriever = None
         try:
-            retriever = K8sHybridRetriever(
-                log_content=combined_logs,
-                llama_stack_url=self.llama_stack_url
-            )
+            if combined_size > self.streaming_threshold_chars:
+                # Very large inputs: chunk, index and embed in bounded memory
+                # (index memory only; the log text itself is in state)
+                print("💾 Large log context, using disk-backed streaming retriever")
+                retriever = StreamingHybridRetriever(
+                    itertools.chain(iter_lines(log_context), iter_lines(events_section)),
+                    llama_stack_url=self.llama_stack_url
+                )
+            else:
+                # Indexes are only built on a retrieval cache miss
+                retriever = K8sHybridRetriever(
+                    log_content=log_context + events_section,
+                    llama_stack_url=self.llama_stack_url,
+                    defer_build=True
+                )
             
             # Build enhanced query with context
             enhanced_query = self._build_enhanced_query(question, log_context, state)
@@ -84,28 +138,48 @@ class Nodes:
             print(f"📝 Original Query: {question}")
             print(f"📝 Enhanced Query: {enhanced_query}")
             
-            # Retrieve using NVIDIA's approach (EnsembleRetriever with RRF)
+            # All phrasings of the question (enhanced query, current question,
+            # earlier rewrites) are embedded and searched in one batched pass
+            # and fused with RRF
+            phrasings = [enhanced_query, question] + list(state.get("transformation_history", []))
+            
             # k=10 to ensure we get both Environment (secret) and Volumes (configmap) sections
-            langchain_docs = retriever.retrieve(
-                query=enhanced_query,
+            langchain_docs = retriever.retrieve_multi(
+                queries=phrasings,
                 k=10
             )
             
             # Convert LangChain Documents to our format
             retrieved_docs = []
             for i, doc in enumerate(langchain_docs):
+                metadata = dict(doc.metadata) if hasattr(doc, 'metadata') else {}
                 retrieved_docs.append({
                     'content': doc.page_content,
-                    'score': 1.0 / (i + 1),  # Simple ranking score
+                    'score': metadata.pop('rrf_score', 1.0 / (i + 1)),  # Fused RRF score
                     'retrieval_method': 'nvidia_hybrid',
-                    'metadata': doc.metadata if hasattr(doc, 'metadata') else {}
+                    'metadata': metadata
                 })
             
             print(f"✅ Retrieved {len(retrieved_docs)} documents using NVIDIA approach")
             
+            signatures = sorted({
+                label
+                for doc in retrieved_docs
+                for label in doc['metadata'].get('failure_signatures', [])
+            })
+            if signatures:
+                print(f"📌 Pinned chunks with failure signatures: {', '.join(signatures)}")
+            
+            cache_counter = "retrieval_cache_hits" if retriever.last_cache_hit else "retrieval_cache_misses"
+            
             return {
                 "retrieved_docs": retrieved_docs,
-                "question": question
+                "question": question,
+                "analysis_metadata": self._record_metadata(
+                    state,
+                    counters={cache_counter: 1},
+                    failure_signatures=signatures
+                )
             }
             
         except Exception as e:
@@ -116,11 +190,17 @@ class Nodes:
                 "retrieved_docs": [],
                 "question": question
             }
+        finally:
+            # Streaming retriever spill files are per-query
+            if isinstance(retriever, StreamingHybridRetriever):
+                retriever.close()
     
     def rerank(self, state: GraphState) -> Dict[str, Any]:
         """
         NODE 2: Reranking
         Reranks retrieved documents using BGE Reranker v2-m3
+        Skipped when retrieval is decisive; chunks with failure signatures
+        are kept on top without reranking (see _plan_rerank)
         """
         print("\n" + "="*60)
         print("🎯 NODE 2: RERANK (BGE Reranker v2-m3)")
@@ -133,15 +213,42 @@ class Nodes:
             print("⚠️  No documents to rerank")
             return {"reranked_docs": [], "question": question}
         
+        # Chunks with known failure signatures stay pinned on top and are
+        # not sent to the reranker
+        pinned_docs = [d for d in retrieved_docs if d.get('metadata', {}).get('failure_signatures')]
+        candidates = [d for d in retrieved_docs if not d.get('metadata', {}).get('failure_signatures')]
+        decision = self._plan_rerank(pinned_docs, candidates, state.get("iteration", 0))
+        
+        if decision and decision["action"] == "skip":
+            print(f"⏭️  Skipping rerank ({decision['reason']}): keeping retrieval order")
+            return {
+                "reranked_docs": pinned_docs + candidates,
+                "question": question,
+                "analysis_metadata": self._record_rerank_decision(state, decision)
+            }
+        
         try:
-            print(f"📊 Reranking {len(retrieved_docs)} documents with BGE...")
+            if decision:
+                print(f"✂️  Reranking only {len(candidates)} unpinned of {len(retrieved_docs)} documents "
+                      f"({decision['reason']})")
+            print(f"📊 Reranking {len(candidates)} documents with BGE...")
             
-            # Use BGE Reranker
-            reranked_docs = self.reranker.rerank_documents(
-                query=question,
-                documents=retrieved_docs,
-                top_k=10  # Keep all retrieved docs to ensure complete context
-            )
+            # Use BGE Reranker: one batched sync request; concurrent requests
+            # (with a whole-batch deadline) only when several are needed
+            if self.reranker.needs_concurrency(len(candidates)):
+                reranked = self.reranker.rerank_documents_concurrent(
+                    query=question,
+                    documents=candidates,
+                    top_k=10  # Keep all retrieved docs to ensure complete context
+                )
+            else:
+                reranked = self.reranker.rerank_documents(
+                    query=question,
+                    documents=candidates,
+                    top_k=10  # Keep all retrieved docs to ensure complete context
+                )
+            
+            reranked_docs = pinned_docs + reranked.documents
             
             # Log reranking results
             print(f"\n✅ BGE Reranked to top {len(reranked_docs)} documents:")
@@ -150,9 +257,15 @@ class Nodes:
                       f"Original Rank: {doc.get('original_rank', 'N/A')} → New Rank: {doc.get('new_rank', i)}")
                 print(f"     {doc['content'][:100]}...")
             
+            print(f"⚡ Rerank cache: {reranked.cache_hits} hits, {reranked.cache_misses} misses")
+            
             return {
                 "reranked_docs": reranked_docs,
-                "question": question
+                "question": question,
+                "analysis_metadata": self._record_rerank_decision(state, decision, counters={
+                    "rerank_cache_hits": reranked.cache_hits,
+                    "rerank_cache_misses": reranked.cache_misses
+                })
             }
             
         except Exception as e:
@@ -170,6 +283,7 @@ class Nodes:
         """
         NODE 3: Grade Documents
         Scores each document for relevance to the question
+        (GRADING_MODE: per_document, parallel or batched)
         """
         print("\n" + "="*60)
         print("📊 NODE 3: GRADE DOCUMENTS")
@@ -186,15 +300,133 @@ class Nodes:
                 "question": question
             }
         
-        # Grade each document
+        # Confident rerank scores decide without the LLM
+        grades = [self._gate_by_rerank_score(doc) for doc in reranked_docs]
+        auto_accepted = grades.count(1.0)
+        auto_rejected = grades.count(0.0)
+        if auto_accepted or auto_rejected:
+            print(f"🚦 Rerank score gate: {auto_accepted} accepted, {auto_rejected} rejected without LLM")
+        
+        # Verdicts from earlier iterations of this run are reused; only
+        # documents not graded yet go to the LLM
+        grade_cache = dict(state.get("grade_cache") or {})
+        keys = [self._grade_cache_key(question, doc) for doc in reranked_docs]
+        cache_hits = 0
+        for i, key in enumerate(keys):
+            if grades[i] is None and key in grade_cache:
+                grades[i] = grade_cache[key]
+                cache_hits += 1
+        pending = [i for i, grade in enumerate(grades) if grade is None]
+        if cache_hits:
+            print(f"♻️  Reusing {cache_hits} cached grades")
+        
+        pending_docs = [reranked_docs[i] for i in pending]
+        new_grades = None if pending_docs else []
+        llm_calls = 0
+        if self.grading_mode == "batched" and len(pending_docs) > 1:
+            print(f"\n📄 Grading {len(pending_docs)} documents in one call...")
+            new_grades = self._grade_batch(question, pending_docs)
+            llm_calls += 1
+            if new_grades is None:
+                print("   ⚠️  Could not parse batched verdicts, grading per document")
+        
+        if new_grades is None:
+            if self.grading_mode == "parallel":
+                new_grades = self._grade_parallel(question, pending_docs)
+            else:
+                # Documents are in rerank order; stop once enough relevant
+                # evidence is confirmed (early exit, off by default)
+                new_grades = []
+                count, mass = self._relevant_evidence(reranked_docs, grades)
+                for i, doc in enumerate(pending_docs):
+                    if self._enough_evidence(count, mass):
+                        break
+                    print(f"\n📄 Grading document {i+1}/{len(pending_docs)}...")
+                    grade = self._grade_document(question, doc)
+                    new_grades.append(grade)
+                    if grade > 0:
+                        count += 1
+                        mass += self._rerank_mass(doc)
+            llm_calls += len(new_grades)
+        
+        for i, grade in zip(pending, new_grades):
+            grades[i] = grade
+            # Errors / timeouts (0.5) are retried next iteration
+            if grade != 0.5:
+                grade_cache[keys[i]] = grade
+        
+        # Passed through ungraded after an early exit (assumed relevant)
+        ungraded = set(pending[len(new_grades):])
+        if ungraded:
+            print(f"⏩ Enough relevant evidence, passing {len(ungraded)} documents through ungraded")
+        
         filtered_docs = []
         relevance_scores = []
+        for i, (doc, grade) in enumerate(zip(reranked_docs, grades)):
+            if i in ungraded:
+                doc = {**doc, 'graded': False}
+                grade = 0.5
+            relevance_scores.append(grade)
+            if grade > 0:
+                filtered_docs.append(doc)
         
-        for i, doc in enumerate(reranked_docs):
-            print(f"\n📄 Grading document {i+1}/{len(reranked_docs)}...")
-            
-            # Build grading prompt with NVIDIA's inclusive philosophy
-            grading_prompt = f"""You are a document relevance evaluator for OpenShift troubleshooting.
+        print(f"\n✅ Filtered to {len(filtered_docs)}/{len(reranked_docs)} relevant documents")
+        
+        return {
+            "reranked_docs": filtered_docs,
+            "relevance_scores": relevance_scores,
+            "question": question,
+            "grade_cache": grade_cache,
+            "analysis_metadata": self._record_metadata(state, counters={
+                "grading_llm_calls": llm_calls,
+                "grade_cache_hits": cache_hits,
+                "grading_auto_accepted": auto_accepted,
+                "grading_auto_rejected": auto_rejected,
+                "grading_early_exit_skips": len(ungraded)
+            })
+        }
+    
+    def _rerank_mass(self, doc: Dict[str, Any]) -> float:
+        """A document's contribution to the relevant score mass (model scores only)"""
+        if doc.get('rerank_fallback'):
+            return 0.0
+        return doc.get('rerank_score', 0.0)
+    
+    def _relevant_evidence(self, docs: List[Dict[str, Any]], grades: List[float]):
+        """(count, rerank score mass) of the documents already graded relevant"""
+        relevant = [doc for doc, grade in zip(docs, grades) if grade]
+        return len(relevant), sum(self._rerank_mass(doc) for doc in relevant)
+    
+    def _enough_evidence(self, count: int, mass: float) -> bool:
+        """Whether the early-exit target count or score mass is reached"""
+        return (
+            (self.grading_early_exit_count > 0 and count >= self.grading_early_exit_count)
+            or (self.grading_early_exit_mass > 0 and mass >= self.grading_early_exit_mass)
+        )
+    
+    def _gate_by_rerank_score(self, doc: Dict[str, Any]) -> float:
+        """
+        1.0 above the accept threshold, 0.0 below the reject threshold (if
+        set), None (grade with the LLM) otherwise or without a real rerank score
+        """
+        score = doc.get('rerank_score')
+        if score is None or doc.get('rerank_fallback'):
+            return None
+        if score >= self.grading_accept_score:
+            return 1.0
+        if self.grading_reject_score > 0 and score < self.grading_reject_score:
+            return 0.0
+        return None
+    
+    def _grade_cache_key(self, question: str, doc: Dict[str, Any]) -> str:
+        """Document content hash (plus the question with GRADE_CACHE_BY_QUESTION=true)"""
+        if self.grade_cache_by_question:
+            return fingerprint_text(question, doc['content'])
+        return fingerprint_text(doc['content'])
+    
+    def _grading_prompt(self, question: str, doc: Dict[str, Any]) -> str:
+        """Build grading prompt with NVIDIA's inclusive philosophy"""
+        return f"""You are a document relevance evaluator for OpenShift troubleshooting.
 
 CRITICAL INSTRUCTION:
 ⭐ Even PARTIAL relevance should be considered as 'yes' to avoid missing important context.
@@ -214,43 +446,138 @@ EVALUATION CRITERIA:
 
 Is this document relevant? Respond ONLY with 'yes' or 'no'.
 """
+    
+    def _grade_document(self, question: str, doc: Dict[str, Any]) -> float:
+        """
+        Grade one document with its own LLM call
+        
+        Returns:
+            1.0 relevant, 0.0 not relevant, 0.5 on error (assumed relevant)
+        """
+        try:
+            # Use LLM for grading
+            response = self.llama_client.inference.chat_completion(
+                model_id=self.llama_model,
+                messages=[
+                    {"role": "user", "content": self._grading_prompt(question, doc)}
+                ],
+                sampling_params={
+                    "strategy": {"type": "greedy"},
+                    "max_tokens": 100
+                },
+                timeout=self.grading_timeout
+            )
             
-            try:
-                # Use LLM for grading
-                response = self.llama_client.inference.chat_completion(
-                    model_id=self.llama_model,
-                    messages=[
-                        {"role": "user", "content": grading_prompt}
-                    ],
-                    sampling_params={
-                        "strategy": {"type": "greedy"},
-                        "max_tokens": 100
-                    }
-                )
-                
-                grade_text = response.completion_message.content.lower()
+            grade_text = response.completion_message.content.lower()
+            
+            # Parse response
+            if 'yes' in grade_text:
+                print(f"   ✅ RELEVANT")
+                return 1.0
+            print(f"   ❌ NOT RELEVANT")
+            return 0.0
                 
-                # Parse response
-                if 'yes' in grade_text:
-                    print(f"   ✅ RELEVANT")
-                    filtered_docs.append(doc)
-                    relevance_scores.append(1.0)
-                else:
-                    print(f"   ❌ NOT RELEVANT")
-                    relevance_scores.append(0.0)
-                    
-            except Exception as e:
-                print(f"   ⚠️  Grading error: {e}, assuming relevant")
-                filtered_docs.append(doc)
-                relevance_scores.append(0.5)
+        except Exception as e:
+            print(f"   ⚠️  Grading error: {e}, assuming relevant")
+            return 0.5
+    
+    def _grade_parallel(self, question: str, docs: List[Dict[str, Any]]) -> List[float]:
+        """
+        Grade documents with concurrent per-document LLM calls
         
-        print(f"\n✅ Filtered to {len(filtered_docs)}/{len(reranked_docs)} relevant documents")
+        Returns:
+            Grades in document order
+        """
+        workers = max(1, min(self.grading_max_concurrency, len(docs)))
+        print(f"\n📄 Grading {len(docs)} documents, {workers} at a time...")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grade") as executor:
+            return list(executor.map(lambda doc: self._grade_document(question, doc), docs))
+    
+    def _grade_batch(self, question: str, docs: List[Dict[str, Any]]) -> List[float]:
+        """
+        Grade all documents with one LLM call (JSON verdicts)
         
-        return {
-            "reranked_docs": filtered_docs,
-            "relevance_scores": relevance_scores,
-            "question": question
-        }
+        Returns:
+            1.0 / 0.0 per document in order, or None if the call failed or
+            the response did not contain a verdict for every document
+        """
+        documents = "\n\n".join(
+            f"[Document {i}]\n{doc['content']}" for i, doc in enumerate(docs, 1)
+        )
+        prompt = f"""You are a document relevance evaluator for OpenShift troubleshooting.
+
+CRITICAL INSTRUCTION:
+⭐ Even PARTIAL relevance should be considered as 'yes' to avoid missing important context.
+⭐ Configuration details (Secrets, ConfigMaps, Volumes, Environment) are RELEVANT even without explicit errors.
+
+Question: {question}
+
+Log Documents:
+{documents}
+
+EVALUATION CRITERIA (for each document):
+- Contains error messages, warnings, failures → YES
+- Contains resource references (Secrets, ConfigMaps, Volumes) → YES
+- Contains pod status, conditions, or events → YES
+- Contains environment variables or mounts → YES
+- Only completely unrelated information → NO
+
+Respond ONLY with a JSON array with one verdict per document, for example:
+[{{"id": 1, "relevant": "yes"}}, {{"id": 2, "relevant": "no"}}]
+"""
+        try:
+            response = self.llama_client.inference.chat_completion(
+                model_id=self.llama_model,
+                messages=[{"role": "user", "content": prompt}],
+                sampling_params={
+                    "strategy": {"type": "greedy"},
+                    "max_tokens": 30 * len(docs) + 50
+                },
+                timeout=self.grading_timeout
+            )
+            grades = self._parse_batch_grades(response.completion_message.content, len(docs))
+        except Exception as e:
+            print(f"   ⚠️  Batched grading error: {e}")
+            return None
+        
+        if grades is not None:
+            for i, grade in enumerate(grades, 1):
+                print(f"   {'✅ RELEVANT' if grade else '❌ NOT RELEVANT'}: document {i}")
+        return grades
+    
+    def _parse_batch_grades(self, text: str, count: int) -> List[float]:
+        """
+        Parse [{"id": 1, "relevant": "yes"}, ...] (or ["yes", "no", ...])
+        
+        Returns:
+            1.0 / 0.0 per document, or None unless every document has a verdict
+        """
+        start, end = text.find("["), text.rfind("]")
+        if start < 0 or end < start:
+            return None
+        try:
+            verdicts = json.loads(text[start:end + 1])
+        except ValueError:
+            return None
+        if not isinstance(verdicts, list):
+            return None
+        
+        grades = [None] * count
+        for position, verdict in enumerate(verdicts):
+            doc_id = position + 1
+            if isinstance(verdict, dict):
+                doc_id = verdict.get("id", doc_id)
+                verdict = verdict.get("relevant")
+            if isinstance(verdict, str):
+                verdict = verdict.strip().lower()
+                verdict = True if verdict in ("yes", "true") else False if verdict in ("no", "false") else None
+            if not isinstance(verdict, bool) or not isinstance(doc_id, int) or not 1 <= doc_id <= count:
+                return None
+            grades[doc_id - 1] = 1.0 if verdict else 0.0
+        
+        if any(grade is None for grade in grades):
+            return None
+        return grades
     
     def generate(self, state: GraphState) -> Dict[str, Any]:
         """
@@ -464,6 +791,74 @@ Return ONLY the rewritten question, nothing else.
                 "iteration": iteration
             }
     
+    def _record_metadata(
+        self,
+        state: GraphState,
+        counters: Dict[str, int] = None,
+        **values: Any
+    ) -> Dict[str, Any]:
+        """
+        Return a copy of the run's analysis_metadata with counters
+        incremented and values set (nodes return the whole dict, since
+        LangGraph replaces state keys on update)
+        """
+        metadata = dict(state.get("analysis_metadata") or {})
+        for key, amount in (counters or {}).items():
+            metadata[key] = metadata.get(key, 0) + amount
+        metadata.update(values)
+        return metadata
+    
+    def _plan_rerank(
+        self,
+        pinned_docs: List[Dict[str, Any]],
+        candidates: List[Dict[str, Any]],
+        iteration: int
+    ) -> Dict[str, Any]:
+        """
+        Decide whether reranking can be skipped or shrunk
+        
+        Returns:
+            None for a full rerank, else a decision with action "skip"
+            (keep retrieval order) or "shrink" (rerank unpinned candidates only)
+        """
+        decision = {
+            "iteration": iteration,
+            "candidates": len(pinned_docs) + len(candidates),
+            "pinned": len(pinned_docs)
+        }
+        
+        if len(candidates) <= self.rerank_skip_max_docs:
+            return {**decision, "action": "skip", "reason": "few_candidates", "reranked": 0}
+        
+        scores = sorted((d.get('score', 0.0) for d in candidates), reverse=True)
+        margin = (scores[0] - scores[1]) / scores[0] if scores[0] > 0 else 0.0
+        if margin >= self.rerank_skip_rrf_margin:
+            return {**decision, "action": "skip", "reason": "rrf_margin",
+                    "rrf_margin": round(margin, 3), "reranked": 0}
+        
+        # Circuit open or last health check failed: skip the call instead of
+        # waiting for the reranker's fallback ranking
+        if not self.reranker.is_available():
+            return {**decision, "action": "skip", "reason": "reranker_unavailable", "reranked": 0}
+        
+        if pinned_docs:
+            return {**decision, "action": "shrink", "reason": "failure_signature",
+                    "reranked": len(candidates)}
+        
+        return None
+    
+    def _record_rerank_decision(
+        self,
+        state: GraphState,
+        decision: Dict[str, Any],
+        counters: Dict[str, int] = None
+    ) -> Dict[str, Any]:
+        """analysis_metadata with the rerank decision appended to rerank_skips"""
+        skips = list((state.get("analysis_metadata") or {}).get("rerank_skips", []))
+        if decision:
+            skips.append(decision)
+        return self._record_metadata(state, counters=counters, rerank_skips=skips)
+    
     def _build_enhanced_query(
         self,
         question: str,
@@ -4,11 +4,21 @@ Combines BM25 (lexical) + Milvus via Llama Stack (semantic)
 """
 
 import os
-from typing import List, Dict, Any
-from rank_bm25 import BM25Okapi
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from llama_stack_client import LlamaStackClient
+from v7_bm25_index import BM25Snapshot, IncrementalBM25, save_bm25_snapshot
+from v7_metadata_index import MetadataIndex
+from v7_cache import fingerprint_text, get_retrieval_cache, normalize_query
 import re
 
+# Milvus via Llama Stack cannot pre-filter on our metadata, so filtered
+# vector queries over-fetch and drop non-matching chunks
+VECTOR_FILTER_OVERFETCH = 4
+
+# Upper bound on concurrent rag_tool.query calls in multi-query retrieval
+MAX_PARALLEL_VECTOR_QUERIES = 4
+
 
 class HybridRetriever:
     """
@@ -38,11 +48,23 @@ class HybridRetriever:
         self.vector_db_id = vector_db_id
         self.alpha = alpha
         
-        # BM25 index (built from logs)
-        self.bm25_index = None
+        # BM25 index (built from logs); corpus lists are indexed by BM25 doc
+        # id, with None in slots freed by removed documents
+        self.bm25_index = IncrementalBM25()
         self.bm25_corpus = []
         self.doc_metadata = []
         
+        # Document key (namespace, pod_name) -> (doc id, content hash)
+        self.doc_keys: Dict[Tuple, Tuple[int, str]] = {}
+        
+        # Metadata inverted index (namespace / pod_name / log_type -> doc ids)
+        self.metadata_index = MetadataIndex()
+        
+        # Retrieval-result cache, keyed by corpus fingerprint
+        self.cache = get_retrieval_cache()
+        self.corpus_fingerprint = fingerprint_text(vector_db_id)
+        self.last_cache_hit = None
+        
     def build_bm25_index(self, documents: List[Dict[str, Any]]):
         """
         Build BM25 index from documents
@@ -52,23 +74,179 @@ class HybridRetriever:
         """
         print(f"📊 Building BM25 index from {len(documents)} documents...")
         
-        # Tokenize documents for BM25
-        tokenized_corpus = []
+        self.close()
+        self.bm25_index = IncrementalBM25()
         self.bm25_corpus = []
         self.doc_metadata = []
+        self.doc_keys = {}
+        self.metadata_index.build([])
         
         for doc in documents:
-            content = doc.get('content', '')
-            self.bm25_corpus.append(content)
-            self.doc_metadata.append(doc.get('metadata', {}))
+            self._add_document(doc)
+        
+        self._refresh_fingerprint()
+        print(f"✅ BM25 index built with {len(self.bm25_index)} documents")
+    
+    def sync_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        key_fields: Tuple[str, ...] = ("namespace", "pod_name"),
+        prune: bool = True
+    ) -> Dict[str, int]:
+        """
+        Incrementally update the BM25 index from a collection cycle
+        
+        Documents are keyed by metadata key_fields (one document per pod).
+        Unchanged documents (same content hash) are skipped, changed ones
+        replaced, and with prune=True documents whose key is absent from
+        this cycle (deleted pods) are removed.
+        
+        Args:
+            documents: List of log documents with 'content' and 'metadata'
+            key_fields: Metadata fields identifying a document across cycles
+            prune: Remove documents not present in this cycle
             
-            # Simple tokenization (can be improved)
-            tokens = self._tokenize(content)
-            tokenized_corpus.append(tokens)
+        Returns:
+            Counts of added / updated / removed / unchanged documents
+        """
+        if isinstance(self.bm25_index, BM25Snapshot):
+            raise RuntimeError("BM25 index was loaded read-only; load with read_only=False to update it")
+        
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+        seen = set()
+        
+        for doc in documents:
+            metadata = doc.get('metadata', {})
+            key = tuple(metadata.get(field) for field in key_fields)
+            content_hash = fingerprint_text(doc.get('content', ''))
+            seen.add(key)
+            
+            existing = self.doc_keys.get(key)
+            if existing is not None:
+                if existing[1] == content_hash:
+                    stats['unchanged'] += 1
+                    continue
+                self._remove_document(existing[0])
+                stats['updated'] += 1
+            else:
+                stats['added'] += 1
+            
+            self.doc_keys[key] = (self._add_document(doc), content_hash)
         
-        # Build BM25 index
-        self.bm25_index = BM25Okapi(tokenized_corpus)
-        print(f"✅ BM25 index built with {len(tokenized_corpus)} documents")
+        if prune:
+            for key in [k for k in self.doc_keys if k not in seen]:
+                doc_id, _ = self.doc_keys.pop(key)
+                self._remove_document(doc_id)
+                stats['removed'] += 1
+        
+        self._refresh_fingerprint()
+        print(f"✅ BM25 index synced: {stats['added']} added, {stats['updated']} updated, "
+              f"{stats['removed']} removed, {stats['unchanged']} unchanged "
+              f"({len(self.bm25_index)} documents)")
+        return stats
+    
+    def _add_document(self, doc: Dict[str, Any]) -> int:
+        """Add one document to BM25, corpus lists and metadata index"""
+        content = doc.get('content', '')
+        metadata = doc.get('metadata', {})
+        doc_id = self.bm25_index.add(self._tokenize(content))
+        
+        if doc_id == len(self.bm25_corpus):
+            self.bm25_corpus.append(content)
+            self.doc_metadata.append(metadata)
+        else:
+            self.bm25_corpus[doc_id] = content
+            self.doc_metadata[doc_id] = metadata
+        self.metadata_index.add(doc_id, metadata)
+        return doc_id
+    
+    def _remove_document(self, doc_id: int):
+        """Remove one document from BM25, corpus lists and metadata index"""
+        self.bm25_index.remove(doc_id)
+        self.metadata_index.remove(doc_id, self.doc_metadata[doc_id])
+        self.bm25_corpus[doc_id] = None
+        self.doc_metadata[doc_id] = None
+    
+    def _refresh_fingerprint(self):
+        # Hash of per-document hashes: cheap to recompute after small updates
+        doc_hashes = sorted(
+            fingerprint_text(content) for content in self.bm25_corpus if content is not None
+        )
+        self.corpus_fingerprint = fingerprint_text(self.vector_db_id, *doc_hashes)
+    
+    def save_bm25_index(self, path: str):
+        """
+        Save the BM25 index and its documents to a snapshot file
+        (see v7_bm25_index for the format)
+        
+        Args:
+            path: Snapshot file path
+        """
+        save_bm25_snapshot(
+            self.bm25_index,
+            path,
+            self.bm25_corpus,
+            self.doc_metadata,
+            extra={
+                'vector_db_id': self.vector_db_id,
+                'corpus_fingerprint': self.corpus_fingerprint
+            }
+        )
+        print(f"💾 BM25 index saved to {path} ({len(self.bm25_index)} documents)")
+    
+    def load_bm25_index(
+        self,
+        path: str,
+        read_only: bool = True,
+        key_fields: Tuple[str, ...] = ("namespace", "pod_name")
+    ):
+        """
+        Load a BM25 snapshot written by save_bm25_index
+        
+        Args:
+            path: Snapshot file path
+            read_only: Query the memory-mapped snapshot directly (fast, shared
+                       between processes); False rebuilds a mutable index so
+                       sync_documents can continue updating it
+            key_fields: Metadata fields used as document keys by sync_documents
+        """
+        # A previously loaded snapshot's mmap is released first
+        self.close()
+        snapshot = BM25Snapshot(path)
+        
+        if read_only:
+            self.bm25_index = snapshot
+            self.bm25_corpus = snapshot.contents
+            self.doc_metadata = snapshot.metadata
+            self.doc_keys = {}
+        else:
+            self.bm25_index = snapshot.to_incremental()
+            self.bm25_corpus = list(snapshot.contents)
+            self.doc_metadata = list(snapshot.metadata)
+            self.doc_keys = {
+                tuple(metadata.get(field) for field in key_fields): (doc_id, fingerprint_text(content))
+                for doc_id, (content, metadata) in enumerate(zip(self.bm25_corpus, self.doc_metadata))
+            }
+        
+        self.metadata_index.build(list(snapshot.metadata))
+        self.corpus_fingerprint = snapshot.extra.get('corpus_fingerprint') or fingerprint_text(
+            self.vector_db_id, *sorted(fingerprint_text(c) for c in snapshot.contents)
+        )
+        print(f"📂 BM25 index loaded from {path} ({len(snapshot)} documents, "
+              f"{'read-only' if read_only else 'mutable'})")
+        if not read_only:
+            # Everything was copied into the mutable index
+            snapshot.close()
+    
+    def close(self):
+        """Release a read-only BM25 snapshot (the index is empty afterwards)"""
+        if isinstance(self.bm25_index, BM25Snapshot):
+            self.bm25_index.close()
+            self.bm25_index = IncrementalBM25()
+            self.bm25_corpus = []
+            self.doc_metadata = []
+            self.doc_keys = {}
+            self.metadata_index.build([])
     
     def _tokenize(self, text: str) -> List[str]:
         """
@@ -81,41 +259,57 @@ class HybridRetriever:
         tokens = re.findall(r'\b\w+\b', text)
         return tokens
     
-    def retrieve_bm25(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+    def retrieve_bm25(
+        self,
+        query: str,
+        k: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Retrieve documents using BM25 lexical matching
         
         Args:
             query: Search query
             k: Number of documents to retrieve
+            filters: Metadata filters, e.g. {'namespace': 'model', 'pod_name': [...]}
+                     Only matching documents are scored
             
         Returns:
             List of documents with BM25 scores
         """
-        if self.bm25_index is None:
+        if not len(self.bm25_index):
             print("⚠️  BM25 index not built yet")
             return []
         
         # Tokenize query
         query_tokens = self._tokenize(query)
         
-        # Get BM25 scores
-        bm25_scores = self.bm25_index.get_scores(query_tokens)
+        # Restrict candidates via the metadata index before scoring
+        candidate_bits = self.metadata_index.lookup(filters)
+        if candidate_bits is None:
+            doc_ids = self.bm25_index.doc_ids()
+        else:
+            doc_ids = MetadataIndex.to_doc_ids(candidate_bits)
+            if not doc_ids:
+                print(f"🔍 BM25: no documents match filters {filters}")
+                return []
+        bm25_scores = self.bm25_index.get_scores(query_tokens, doc_ids)
         
-        # Get top-k indices
-        top_indices = sorted(
-            range(len(bm25_scores)),
+        # Get top-k candidates (positions into doc_ids / bm25_scores)
+        top_positions = sorted(
+            range(len(doc_ids)),
             key=lambda i: bm25_scores[i],
             reverse=True
         )[:k]
         
         # Build results
         results = []
-        for idx in top_indices:
-            if bm25_scores[idx] > 0:  # Only include non-zero scores
+        for pos in top_positions:
+            idx = doc_ids[pos]
+            if bm25_scores[pos] > 0:  # Only include non-zero scores
                 results.append({
                     'content': self.bm25_corpus[idx],
-                    'score': float(bm25_scores[idx]),
+                    'score': float(bm25_scores[pos]),
                     'retrieval_method': 'bm25',
                     'metadata': self.doc_metadata[idx]
                 })
@@ -123,34 +317,46 @@ class HybridRetriever:
         print(f"🔍 BM25 retrieved {len(results)} documents")
         return results
     
-    def retrieve_vector(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+    def retrieve_vector(
+        self,
+        query: str,
+        k: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Retrieve documents using Milvus vector search via Llama Stack
         
         Args:
             query: Search query
             k: Number of documents to retrieve
+            filters: Metadata filters (same format as retrieve_bm25)
             
         Returns:
             List of documents with similarity scores
         """
         try:
+            max_chunks = k * VECTOR_FILTER_OVERFETCH if filters else k
+            
             # Use Llama Stack RAG tool for vector search
             response = self.llama_client.tool_runtime.rag_tool.query(
                 content=query,
                 vector_db_ids=[self.vector_db_id],
-                query_config={"max_chunks": k}
+                query_config={"max_chunks": max_chunks}
             )
             
             # Format results
             results = []
             for i, chunk in enumerate(response.chunks):
+                metadata = chunk.metadata if hasattr(chunk, 'metadata') else {}
+                if not MetadataIndex.matches(metadata, filters):
+                    continue
                 results.append({
                     'content': chunk.content,
                     'score': getattr(chunk, 'score', 0.0),
                     'retrieval_method': 'vector',
-                    'metadata': chunk.metadata if hasattr(chunk, 'metadata') else {}
+                    'metadata': metadata
                 })
+            results = results[:k]
             
             print(f"🔍 Vector search retrieved {len(results)} documents")
             return results
@@ -159,7 +365,12 @@ class HybridRetriever:
             print(f"❌ Vector retrieval error: {e}")
             return []
     
-    def hybrid_retrieve(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+    def hybrid_retrieve(
+        self,
+        query: str,
+        k: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Hybrid retrieval combining BM25 and vector search
         Uses Reciprocal Rank Fusion (RRF) for score combination
@@ -167,15 +378,31 @@ class HybridRetriever:
         Args:
             query: Search query
             k: Number of documents to retrieve
+            filters: Metadata filters, e.g. {'namespace': 'model'}
             
         Returns:
             Combined ranked list of documents
         """
         print(f"\n🔄 Hybrid Retrieval for: '{query}'")
+        if filters:
+            print(f"   🔎 Filters: {filters}")
+        
+        cache_key = (
+            "hybrid",
+            self.corpus_fingerprint,
+            normalize_query(query),
+            k,
+            repr(sorted((filters or {}).items()))
+        )
+        cached = self.cache.get(cache_key)
+        self.last_cache_hit = cached is not None
+        if cached is not None:
+            print(f"⚡ Retrieval cache hit ({len(cached)} documents)")
+            return [dict(doc) for doc in cached]
         
         # Retrieve from both sources
-        bm25_results = self.retrieve_bm25(query, k=k*2)  # Get more for fusion
-        vector_results = self.retrieve_vector(query, k=k*2)
+        bm25_results = self.retrieve_bm25(query, k=k*2, filters=filters)  # Get more for fusion
+        vector_results = self.retrieve_vector(query, k=k*2, filters=filters)
         
         # Combine using Reciprocal Rank Fusion
         fused_results = self._reciprocal_rank_fusion(
@@ -184,9 +411,94 @@ class HybridRetriever:
             k=k
         )
         
+        self.cache.put(cache_key, [dict(doc) for doc in fused_results])
+        
         print(f"✅ Hybrid retrieval returned {len(fused_results)} documents")
         return fused_results
     
+    def retrieve_vector_multi(
+        self,
+        queries: List[str],
+        k: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Vector search for several phrasings of one question
+        
+        The Llama Stack RAG tool takes one query per call, so the calls are
+        issued concurrently instead of one after another.
+        
+        Args:
+            queries: Query phrasings
+            k: Number of documents to retrieve per phrasing
+            filters: Metadata filters (same format as retrieve_bm25)
+            
+        Returns:
+            One result list per query, in input order
+        """
+        if len(queries) <= 1:
+            return [self.retrieve_vector(q, k=k, filters=filters) for q in queries]
+        
+        with ThreadPoolExecutor(max_workers=min(len(queries), MAX_PARALLEL_VECTOR_QUERIES)) as pool:
+            return list(pool.map(
+                lambda q: self.retrieve_vector(q, k=k, filters=filters),
+                queries
+            ))
+    
+    def multi_query_retrieve(
+        self,
+        queries: List[str],
+        k: int = 10,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Hybrid retrieval over several phrasings of one question
+        (original question, enhanced query, transformation history)
+        
+        BM25 runs locally per phrasing, vector searches run concurrently,
+        and all ranked lists are fused with RRF.
+        
+        Args:
+            queries: Query phrasings (duplicates after normalization are dropped)
+            k: Number of documents to retrieve
+            filters: Metadata filters, e.g. {'namespace': 'model'}
+            
+        Returns:
+            Combined ranked list of documents
+        """
+        unique_queries = {}
+        for query in queries:
+            if query and query.strip():
+                unique_queries.setdefault(normalize_query(query), query)
+        queries = list(unique_queries.values())
+        
+        if len(queries) <= 1:
+            return self.hybrid_retrieve(queries[0] if queries else "", k=k, filters=filters)
+        
+        print(f"\n🔄 Multi-Query Hybrid Retrieval ({len(queries)} phrasings)")
+        
+        cache_key = (
+            "hybrid-multi",
+            self.corpus_fingerprint,
+            tuple(unique_queries.keys()),
+            k,
+            repr(sorted((filters or {}).items()))
+        )
+        cached = self.cache.get(cache_key)
+        self.last_cache_hit = cached is not None
+        if cached is not None:
+            print(f"⚡ Retrieval cache hit ({len(cached)} documents)")
+            return [dict(doc) for doc in cached]
+        
+        bm25_lists = [self.retrieve_bm25(q, k=k*2, filters=filters) for q in queries]
+        vector_lists = self.retrieve_vector_multi(queries, k=k*2, filters=filters)
+        
+        fused_results = self._fuse_ranked_lists(bm25_lists, vector_lists, k=k)
+        self.cache.put(cache_key, [dict(doc) for doc in fused_results])
+        
+        print(f"✅ Multi-query retrieval returned {len(fused_results)} documents")
+        return fused_results
+    
     def _reciprocal_rank_fusion(
         self,
         bm25_results: List[Dict[str, Any]],
@@ -201,42 +513,44 @@ class HybridRetriever:
         
         This is more robust than simple score averaging
         """
+        return self._fuse_ranked_lists([bm25_results], [vector_results], k=k, rrf_k=rrf_k)
+    
+    def _fuse_ranked_lists(
+        self,
+        bm25_lists: List[List[Dict[str, Any]]],
+        vector_lists: List[List[Dict[str, Any]]],
+        k: int = 10,
+        rrf_k: int = 60  # RRF constant
+    ) -> List[Dict[str, Any]]:
+        """
+        RRF over any number of BM25 and vector result lists
+        BM25 lists are weighted (1 - alpha), vector lists alpha
+        """
         # Build document lookup with RRF scores
         doc_scores = {}
         
-        # Process BM25 results
-        for rank, doc in enumerate(bm25_results, start=1):
-            content = doc['content']
-            rrf_score = 1.0 / (rrf_k + rank)
-            
-            if content not in doc_scores:
-                doc_scores[content] = {
-                    'content': content,
-                    'rrf_score': 0.0,
-                    'bm25_score': doc.get('score', 0.0),
-                    'vector_score': 0.0,
-                    'metadata': doc.get('metadata', {})
-                }
-            
-            doc_scores[content]['rrf_score'] += rrf_score * (1 - self.alpha)
-            doc_scores[content]['bm25_score'] = doc.get('score', 0.0)
-        
-        # Process vector results
-        for rank, doc in enumerate(vector_results, start=1):
-            content = doc['content']
-            rrf_score = 1.0 / (rrf_k + rank)
-            
-            if content not in doc_scores:
-                doc_scores[content] = {
-                    'content': content,
-                    'rrf_score': 0.0,
-                    'bm25_score': 0.0,
-                    'vector_score': doc.get('score', 0.0),
-                    'metadata': doc.get('metadata', {})
-                }
-            
-            doc_scores[content]['rrf_score'] += rrf_score * self.alpha
-            doc_scores[content]['vector_score'] = doc.get('score', 0.0)
+        for method, ranked_lists, weight in (
+            ('bm25', bm25_lists, 1 - self.alpha),
+            ('vector', vector_lists, self.alpha)
+        ):
+            score_field = f'{method}_score'
+            for results in ranked_lists:
+                for rank, doc in enumerate(results, start=1):
+                    content = doc['content']
+                    rrf_score = 1.0 / (rrf_k + rank)
+                    
+                    if content not in doc_scores:
+                        doc_scores[content] = {
+                            'content': content,
+                            'rrf_score': 0.0,
+                            'bm25_score': 0.0,
+                            'vector_score': 0.0,
+                            'metadata': doc.get('metadata', {})
+                        }
+                    
+                    entry = doc_scores[content]
+                    entry['rrf_score'] += rrf_score * weight
+                    entry[score_field] = max(entry[score_field], doc.get('score', 0.0))
         
         # Sort by RRF score and return top-k
         sorted_docs = sorted(
@@ -294,6 +608,40 @@ def test_hybrid_retriever():
         print(f"   Score: {result['score']:.4f} | Method: {result['retrieval_method']}")
 
 
+def test_bm25_snapshot_reload():
+    """Load a read-only snapshot twice and close it (no service needed)"""
+    import tempfile
+    
+    retriever = HybridRetriever("http://localhost:8321")
+    retriever.build_bm25_index([
+        {'content': 'Container exited with code 137 (OOMKilled)',
+         'metadata': {'namespace': 'default', 'pod_name': 'web-1'}},
+        {'content': 'Back-off pulling image nginx:latest',
+         'metadata': {'namespace': 'default', 'pod_name': 'web-2'}},
+        {'content': 'Readiness probe failed: connection refused',
+         'metadata': {'namespace': 'default', 'pod_name': 'web-3'}}
+    ])
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'bm25.snap')
+        retriever.save_bm25_index(path)
+        
+        retriever.load_bm25_index(path, read_only=True)
+        first = retriever.bm25_index
+        retriever.load_bm25_index(path, read_only=True)
+        assert first._mmap.closed, "reload leaked the previous snapshot"
+        assert retriever.retrieve_bm25('OOMKilled', k=1)[0]['metadata']['pod_name'] == 'web-1'
+        
+        retriever.close()
+        assert len(retriever.bm25_index) == 0
+        
+        retriever.load_bm25_index(path, read_only=False)
+        assert len(retriever.bm25_index) == 3
+    
+    print("✅ BM25 snapshot load → close OK")
+
+
 if __name__ == "__main__":
+    test_bm25_snapshot_reload()
     test_hybrid_retriever()
 
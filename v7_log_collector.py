@@ -6,10 +6,14 @@ Collects logs from OpenShift and indexes them for retrieval
 import os
 import subprocess
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from llama_stack_client import LlamaStackClient
+from llama_stack_client import LlamaStackClient, RAGDocument
+from v7_cache import fingerprint_text
 from v7_hybrid_retriever import HybridRetriever
+from v7_retention_manager import RetentionManager
 
 
 class OpenShiftLogCollector:
@@ -39,12 +43,32 @@ class OpenShiftLogCollector:
         self.namespaces = namespaces or ["default"]
         self.use_mcp = use_mcp
         
+        # Vector DB ingestion: bounded batches, a few in flight, retried
+        self.ingest_batch_size = int(os.getenv("INGEST_BATCH_SIZE", "16"))
+        self.ingest_max_in_flight = int(os.getenv("INGEST_MAX_IN_FLIGHT", "3"))
+        self.ingest_max_retries = int(os.getenv("INGEST_MAX_RETRIES", "3"))
+        
+        # Retention ledger (document_id -> namespace, last_seen) survives
+        # restarts, so it also seeds the set of already-ingested documents
+        self.retention = RetentionManager(vector_db_id)
+        
+        # Content-hash document IDs already in the vector DB
+        self.ingested_doc_ids = set(self.retention.document_ids())
+        
         # Initialize hybrid retriever
         self.retriever = HybridRetriever(
             llama_stack_url=llama_stack_url,
             vector_db_id=vector_db_id
         )
         
+        # Persist the BM25 index across restarts (and for other processes)
+        self.bm25_snapshot_path = os.getenv("BM25_SNAPSHOT_PATH")
+        if self.bm25_snapshot_path and os.path.exists(self.bm25_snapshot_path):
+            try:
+                self.retriever.load_bm25_index(self.bm25_snapshot_path, read_only=False)
+            except Exception as e:
+                print(f"⚠️  Could not load BM25 snapshot, starting empty: {e}")
+        
         print(f"🔧 Log Collector initialized")
         print(f"   📊 Vector DB: {vector_db_id}")
         print(f"   📁 Namespaces: {namespaces}")
@@ -224,52 +248,123 @@ class OpenShiftLogCollector:
         
         return all_logs
     
-    def ingest_to_vector_db(self, log_documents: List[Dict[str, Any]]):
+    @staticmethod
+    def document_id(doc: Dict[str, Any]) -> str:
+        """Content-hash document ID (identical content → identical ID)"""
+        return f"log-{fingerprint_text(doc['content'])[:32]}"
+    
+    def ingest_to_vector_db(self, log_documents: List[Dict[str, Any]]) -> Dict[str, int]:
         """
         Ingest log documents into Milvus via Llama Stack
         
+        Documents whose content hash was already ingested are skipped; the
+        rest are inserted in batches of ingest_batch_size with up to
+        ingest_max_in_flight inserts running concurrently.
+        
         Args:
             log_documents: List of log documents to ingest
+            
+        Returns:
+            Counts of inserted / skipped / failed documents
         """
-        print(f"\n📊 Ingesting {len(log_documents)} documents into vector DB...")
+        # Prepare RAG documents (deduplicated by content hash)
+        rag_docs = {}
+        namespaces = {}
+        for doc in log_documents:
+            doc_id = self.document_id(doc)
+            namespaces[doc_id] = doc.get('metadata', {}).get('namespace')
+            if doc_id in self.ingested_doc_ids or doc_id in rag_docs:
+                continue
+            rag_docs[doc_id] = RAGDocument(
+                document_id=doc_id,
+                content=doc['content'],
+                metadata=doc.get('metadata', {})
+            )
         
-        try:
-            # Prepare RAG documents
-            rag_docs = []
-            for i, doc in enumerate(log_documents):
-                rag_doc = RAGDocument(
-                    document_id=f"log-{i}-{datetime.now().timestamp()}",
-                    content=doc['content'],
-                    metadata=doc.get('metadata', {})
+        stats = {'inserted': 0, 'skipped': len(log_documents) - len(rag_docs), 'failed': 0}
+        print(f"\n📊 Ingesting {len(rag_docs)} new documents into vector DB "
+              f"({stats['skipped']} already ingested or duplicate)...")
+        if not rag_docs:
+            self._touch_ingested(namespaces)
+            return stats
+        
+        docs = list(rag_docs.values())
+        batches = [
+            docs[start:start + self.ingest_batch_size]
+            for start in range(0, len(docs), self.ingest_batch_size)
+        ]
+        
+        with ThreadPoolExecutor(max_workers=self.ingest_max_in_flight) as pool:
+            for batch, ok in zip(batches, pool.map(self._insert_batch, batches)):
+                if ok:
+                    self.ingested_doc_ids.update(doc.document_id for doc in batch)
+                    stats['inserted'] += len(batch)
+                else:
+                    stats['failed'] += len(batch)
+        
+        self._touch_ingested(namespaces)
+        
+        if stats['failed']:
+            print(f"⚠️  Ingested {stats['inserted']} documents, {stats['failed']} failed "
+                  f"(will retry next cycle)")
+        else:
+            print(f"✅ Successfully ingested {stats['inserted']} documents to vector DB: {self.vector_db_id}")
+        return stats
+    
+    def _touch_ingested(self, namespaces: Dict[str, Optional[str]]):
+        """Record this cycle's ingested documents as seen in the retention ledger"""
+        self.retention.touch(
+            (doc_id, namespace) for doc_id, namespace in namespaces.items()
+            if doc_id in self.ingested_doc_ids
+        )
+    
+    def run_retention(self) -> Dict[str, Any]:
+        """
+        Delete vector DB documents past their namespace's max age and compact
+        
+        Returns:
+            Retention report (expired / deleted counts, row counts before and after)
+        """
+        report = self.retention.run()
+        # Deleted documents must be re-ingested if their content reappears
+        self.ingested_doc_ids.intersection_update(self.retention.documents)
+        return report
+    
+    def _insert_batch(self, batch: List[Any]) -> bool:
+        """Insert one batch, retrying with exponential backoff"""
+        for attempt in range(self.ingest_max_retries + 1):
+            try:
+                self.llama_client.tool_runtime.rag_tool.insert(
+                    documents=batch,
+                    vector_db_id=self.vector_db_id,
+                    chunk_size_in_tokens=512
                 )
-                rag_docs.append(rag_doc)
-            
-            # Ingest to Llama Stack
-            self.llama_client.tool_runtime.rag_tool.insert(
-                documents=rag_docs,
-                vector_db_id=self.vector_db_id,
-                chunk_size_in_tokens=512
-            )
-            
-            print(f"✅ Successfully ingested to vector DB: {self.vector_db_id}")
-            
-        except Exception as e:
-            print(f"❌ Failed to ingest to vector DB: {e}")
+                return True
+            except Exception as e:
+                if attempt == self.ingest_max_retries:
+                    print(f"❌ Failed to ingest batch of {len(batch)} documents: {e}")
+                    return False
+                delay = 2 ** attempt
+                print(f"⚠️  Ingest batch failed ({e}), retrying in {delay}s...")
+                time.sleep(delay)
     
-    def build_bm25_index(self, log_documents: List[Dict[str, Any]]):
+    def update_bm25_index(self, log_documents: List[Dict[str, Any]]):
         """
-        Build BM25 index from log documents
+        Incrementally update the BM25 index from this cycle's documents
+        (only new/changed pods are re-tokenized; deleted pods are pruned)
         
         Args:
             log_documents: List of log documents
         """
-        print(f"\n📊 Building BM25 index from {len(log_documents)} documents...")
+        print(f"\n📊 Updating BM25 index from {len(log_documents)} documents...")
         
         try:
-            self.retriever.build_bm25_index(log_documents)
-            print(f"✅ BM25 index built successfully")
+            stats = self.retriever.sync_documents(log_documents)
+            if self.bm25_snapshot_path and (stats['added'] or stats['updated'] or stats['removed']
+                                            or not os.path.exists(self.bm25_snapshot_path)):
+                self.retriever.save_bm25_index(self.bm25_snapshot_path)
         except Exception as e:
-            print(f"❌ Failed to build BM25 index: {e}")
+            print(f"❌ Failed to update BM25 index: {e}")
     
     def index_logs(self, log_documents: List[Dict[str, Any]]):
         """
@@ -283,8 +378,8 @@ class OpenShiftLogCollector:
         # Ingest to vector DB (Milvus)
         self.ingest_to_vector_db(log_documents)
         
-        # Build BM25 index
-        self.build_bm25_index(log_documents)
+        # Update BM25 index
+        self.update_bm25_index(log_documents)
         
         print(f"\n✅ Indexing complete!")
     
@@ -343,6 +438,13 @@ def setup_log_collection_job(
         except Exception as e:
             print(f"❌ Collection cycle error: {e}")
         
+        # Retention and compaction run on their own (longer) schedule
+        if collector.retention.due():
+            try:
+                collector.run_retention()
+            except Exception as e:
+                print(f"❌ Retention error: {e}")
+        
         print(f"\n⏳ Waiting {interval_minutes} minutes until next collection...")
         time.sleep(interval_minutes * 60)
 
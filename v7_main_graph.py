@@ -165,6 +165,7 @@ def run_analysis(
         "retrieved_docs": [],
         "reranked_docs": [],
         "relevance_scores": [],
+        "grade_cache": {},
         
         # Generation (empty initially)
         "generation": "",
@@ -176,7 +177,8 @@ def run_analysis(
         
         # Metadata
         "timestamp": datetime.now().isoformat(),
-        "data_source": "mcp"
+        "data_source": "mcp",
+        "analysis_metadata": {}
     }
     
     print(f"\n📝 Question: {question}")
@@ -217,7 +219,8 @@ def run_analysis(
                     sum(final_state.get("relevance_scores", [])) / 
                     len(final_state.get("relevance_scores", []))
                     if final_state.get("relevance_scores") else 0
-                )
+                ),
+                **final_state.get("analysis_metadata", {})
             }
         }
         
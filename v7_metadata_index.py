@@ -0,0 +1,111 @@
+"""
+AI Troubleshooter v7 - Metadata Inverted Index
+Maps metadata field values (namespace, pod, log type) to doc-id bitsets
+so retrieval can be restricted to matching documents before scoring
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class MetadataIndex:
+    """
+    Inverted index from metadata fields to document-id bitsets
+
+    Bitsets are Python ints (bit i set = document i matches), which keeps
+    AND/OR across fields cheap without an extra dependency.
+    """
+
+    DEFAULT_FIELDS = ("namespace", "pod_name", "log_type")
+
+    def __init__(self, fields: Iterable[str] = DEFAULT_FIELDS):
+        """
+        Initialize metadata index
+
+        Args:
+            fields: Metadata fields to index
+        """
+        self.fields = tuple(fields)
+        self.postings: Dict[str, Dict[Any, int]] = {f: {} for f in self.fields}
+
+    def build(self, metadata_list: List[Dict[str, Any]]):
+        """
+        Rebuild the index from a list of metadata dicts (doc id = position)
+
+        Args:
+            metadata_list: Metadata for each document, in doc-id order
+        """
+        self.postings = {f: {} for f in self.fields}
+        for doc_id, metadata in enumerate(metadata_list):
+            self.add(doc_id, metadata)
+
+    def add(self, doc_id: int, metadata: Dict[str, Any]):
+        """Set doc_id's bit under each indexed field value"""
+        bit = 1 << doc_id
+        for field in self.fields:
+            value = (metadata or {}).get(field)
+            if value is not None:
+                values = self.postings[field]
+                values[value] = values.get(value, 0) | bit
+
+    def remove(self, doc_id: int, metadata: Dict[str, Any]):
+        """Clear doc_id's bit under each indexed field value"""
+        mask = ~(1 << doc_id)
+        for field in self.fields:
+            value = (metadata or {}).get(field)
+            values = self.postings[field]
+            if value in values:
+                values[value] &= mask
+                if not values[value]:
+                    del values[value]
+
+    def lookup(self, filters: Optional[Dict[str, Any]]) -> Optional[int]:
+        """
+        Resolve filters to a bitset of matching doc ids
+
+        Args:
+            filters: {field: value} or {field: [values]}; fields are ANDed,
+                     a list of values is ORed
+
+        Returns:
+            Bitset of matching docs, or None when there are no filters
+        """
+        if not filters:
+            return None
+
+        result = None
+        for field, wanted in filters.items():
+            if field not in self.postings:
+                raise KeyError(f"Metadata field '{field}' is not indexed")
+
+            values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            field_bits = 0
+            for value in values:
+                field_bits |= self.postings[field].get(value, 0)
+
+            result = field_bits if result is None else result & field_bits
+            if not result:
+                return 0
+
+        return result
+
+    @staticmethod
+    def to_doc_ids(bitset: int) -> List[int]:
+        """Expand a bitset into a sorted list of doc ids"""
+        doc_ids = []
+        while bitset:
+            low_bit = bitset & -bitset
+            doc_ids.append(low_bit.bit_length() - 1)
+            bitset ^= low_bit
+        return doc_ids
+
+    @staticmethod
+    def matches(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+        """Check a single metadata dict against filters (same semantics as lookup)"""
+        if not filters:
+            return True
+        metadata = metadata or {}
+        for field, wanted in filters.items():
+            values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            if metadata.get(field) not in values:
+                return False
+        return True
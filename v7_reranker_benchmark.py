@@ -0,0 +1,287 @@
+"""
+BGE Reranker Benchmark
+Measures BGEReranker latency (p50/p95/p99) and throughput (docs/sec)
+without the GPU service: a local stub server mimics vLLM's /score and
+/health endpoints with configurable per-request latency, payload-size
+dependent cost and error injection.
+
+Modes:
+    single      one /score request per document (sync)
+    batched     one /score request per batch_size documents (sync)
+    concurrent  one /score request per document, sent concurrently
+                (async, RERANK_MAX_CONCURRENCY)
+
+Usage:
+    python v7_reranker_benchmark.py --docs 10 50 --doc-chars 500 2000
+    python v7_reranker_benchmark.py --latency-ms 20 --per-kchar-ms 2 --error-rate 0.05
+    python v7_reranker_benchmark.py --doc-chars 4000 --max-tokens 0
+"""
+
+import argparse
+import json
+import logging
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import numpy as np
+
+from v7_bge_reranker import BGEReranker
+
+MODES = ["single", "batched", "concurrent"]
+
+LOG_WORDS = (
+    "pod container restart error warning failed killed memory limit exceeded "
+    "timeout connection refused readiness liveness probe image pull backoff "
+    "volume mount configmap secret not found scheduling insufficient cpu node"
+).split()
+
+
+class StubScoreConfig:
+    """Behaviour of the stub /score server (mutable while it runs)"""
+
+    def __init__(
+        self,
+        latency_ms: float = 10.0,
+        per_kchar_ms: float = 1.0,
+        error_rate: float = 0.0,
+        reject_lists: bool = False,
+        seed: int = 0
+    ):
+        """
+        Args:
+            latency_ms: Fixed cost per request (network + scheduling)
+            per_kchar_ms: Additional cost per 1000 characters of query + documents
+            error_rate: Fraction of requests answered with 503
+            reject_lists: Answer 400 to list-valued text_2 (old vLLM)
+            seed: Seed for error injection
+        """
+        self.latency_ms = latency_ms
+        self.per_kchar_ms = per_kchar_ms
+        self.error_rate = error_rate
+        self.reject_lists = reject_lists
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def should_fail(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.error_rate
+            self.errors += failed
+            return failed
+
+
+def stub_score(query: str, document: str) -> float:
+    """Deterministic relevance stand-in: query term overlap"""
+    query_terms = set(re.findall(r"\w+", query.lower()))
+    doc_terms = set(re.findall(r"\w+", document.lower()))
+    if not query_terms:
+        return 0.0
+    return len(query_terms & doc_terms) / len(query_terms)
+
+
+class StubScoreHandler(BaseHTTPRequestHandler):
+    """vLLM-style /score and /health"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, keep-alive
+    # clients would see ~40ms delayed-ACK stalls that the real server lacks
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/score":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        config: StubScoreConfig = self.server.config
+        query = request.get("text_1", "")
+        documents = request.get("text_2", "")
+        is_list = isinstance(documents, list)
+        if not is_list:
+            documents = [documents]
+
+        if is_list and config.reject_lists:
+            self._send_json(400, {"error": "text_2 must be a string"})
+            return
+
+        chars = len(query) * len(documents) + sum(len(doc) for doc in documents)
+        time.sleep((config.latency_ms + config.per_kchar_ms * chars / 1000) / 1000)
+
+        if config.should_fail():
+            self._send_json(503, {"error": "injected failure"})
+            return
+
+        self._send_json(200, {
+            "object": "list",
+            "model": request.get("model"),
+            "data": [
+                {"index": idx, "object": "score", "score": stub_score(query, doc)}
+                for idx, doc in enumerate(documents)
+            ]
+        })
+
+
+class StubScoreServer(ThreadingHTTPServer):
+    # The default listen backlog (5) drops SYNs when concurrent mode opens
+    # RERANK_MAX_CONCURRENCY connections at once, adding 1s retransmit stalls
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def start_stub_server(config: StubScoreConfig, port: int = 0) -> ThreadingHTTPServer:
+    """
+    Start the stub server in a daemon thread
+
+    Returns:
+        The server (URL: http://127.0.0.1:{server.server_address[1]})
+    """
+    server = StubScoreServer(("127.0.0.1", port), StubScoreHandler)
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_documents(num_docs: int, doc_chars: int, seed: int = 0) -> List[str]:
+    """Synthetic log chunks of roughly doc_chars characters"""
+    rng = random.Random(seed)
+    documents = []
+    for i in range(num_docs):
+        words = []
+        size = 0
+        while size < doc_chars:
+            word = rng.choice(LOG_WORDS)
+            words.append(word)
+            size += len(word) + 1
+        documents.append(f"pod-{i} " + " ".join(words)[:doc_chars])
+    return documents
+
+
+def run_mode(
+    reranker: BGEReranker,
+    mode: str,
+    query: str,
+    documents: List[str],
+    repeats: int
+) -> List[float]:
+    """Rerank the same documents repeats times, returning per-call latency in ms"""
+    latencies = []
+    for _ in range(repeats):
+        # Per-document modes pin list support off; batched re-probes it
+        reranker.supports_list_input = None if mode == "batched" else False
+        t0 = time.perf_counter()
+        if mode == "concurrent":
+            reranker.rerank_concurrent(query, documents, top_k=len(documents))
+        else:
+            reranker.rerank(query, documents, top_k=len(documents))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies
+
+
+def run_benchmark(
+    doc_counts: List[int],
+    doc_sizes: List[int],
+    config: StubScoreConfig,
+    repeats: int = 20,
+    batch_size: int = 16,
+    modes: List[str] = None,
+    max_tokens: int = None
+) -> List[Dict[str, Any]]:
+    """Run every mode across document counts and sizes and print a report"""
+    server = start_stub_server(config)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    query = "why was the container killed with memory limit exceeded"
+    results = []
+
+    # cache_size=0: every call must reach the server
+    reranker = BGEReranker(reranker_url=url, batch_size=batch_size, cache_size=0, max_tokens=max_tokens)
+    print(f"🩺 Stub healthy: {reranker.health_check()} ({url})")
+
+    try:
+        for num_docs in doc_counts:
+            for doc_chars in doc_sizes:
+                documents = make_documents(num_docs, doc_chars)
+                print(f"\n📊 {num_docs} docs x {doc_chars} chars "
+                      f"(latency {config.latency_ms}ms + {config.per_kchar_ms}ms/kchar, "
+                      f"errors {config.error_rate:.0%}, batch {batch_size})")
+                print(f"{'mode':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'docs/s':>10}")
+
+                for mode in modes or MODES:
+                    latencies = run_mode(reranker, mode, query, documents, repeats)
+                    row = {
+                        "mode": mode,
+                        "num_docs": num_docs,
+                        "doc_chars": doc_chars,
+                        "p50_ms": float(np.percentile(latencies, 50)),
+                        "p95_ms": float(np.percentile(latencies, 95)),
+                        "p99_ms": float(np.percentile(latencies, 99)),
+                        "docs_per_s": num_docs * len(latencies) / (sum(latencies) / 1000)
+                    }
+                    results.append(row)
+                    print(f"{mode:<12}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+                          f"{row['p99_ms']:>10.1f}{row['docs_per_s']:>10.1f}")
+    finally:
+        reranker.close()
+        server.shutdown()
+
+    print(f"\n🧮 Stub served {config.requests} requests ({config.errors} injected errors)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark BGEReranker against a stub /score server")
+    parser.add_argument("--docs", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--doc-chars", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    parser.add_argument("--per-kchar-ms", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--reject-lists", action="store_true")
+    parser.add_argument("--max-tokens", type=int, default=None,
+                        help="Per-pair token window (0 sends documents untrimmed)")
+    args = parser.parse_args()
+
+    # Per-call INFO logs from the client would dominate the report
+    for name in ("v7_bge_reranker", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    config = StubScoreConfig(
+        latency_ms=args.latency_ms,
+        per_kchar_ms=args.per_kchar_ms,
+        error_rate=args.error_rate,
+        reject_lists=args.reject_lists
+    )
+    run_benchmark(
+        args.docs,
+        args.doc_chars,
+        config,
+        repeats=args.repeats,
+        batch_size=args.batch_size,
+        modes=args.modes,
+        max_tokens=args.max_tokens
+    )
@@ -0,0 +1,239 @@
+"""
+AI Troubleshooter v7 - Vector DB Retention Manager
+Keeps the collector's Milvus collection bounded: tracks which documents
+were ingested (and when each was last seen) in a local ledger, deletes
+documents not seen for longer than a per-namespace max age, and compacts
+the collection on a schedule
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Llama Stack's Milvus provider stores each chunk as JSON; the document id
+# given to rag_tool.insert ends up in the chunk metadata
+DEFAULT_DOCUMENT_ID_FIELD = 'chunk_content["metadata"]["document_id"]'
+
+# Milvus filter expressions get long; delete in slices
+DELETE_BATCH_SIZE = 256
+
+
+def parse_namespace_ages(spec: str) -> Dict[str, float]:
+    """
+    Parse "ns1=72,ns2=6" into {namespace: max age in hours}
+    """
+    ages = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            namespace, hours = item.split("=", 1)
+            ages[namespace.strip()] = float(hours)
+    return ages
+
+
+class RetentionManager:
+    """
+    Age-based retention for a Llama Stack / Milvus vector DB
+
+    The ledger maps document_id -> {namespace, last_seen}. A document
+    expires once it has not been seen by a collection cycle for longer
+    than its namespace's max age (pods whose logs stop changing keep
+    their document alive while they exist).
+    """
+
+    def __init__(
+        self,
+        vector_db_id: str,
+        ledger_path: Optional[str] = None,
+        default_max_age_hours: Optional[float] = None,
+        namespace_max_age_hours: Optional[Dict[str, float]] = None,
+        interval_minutes: Optional[float] = None,
+        milvus_uri: Optional[str] = None
+    ):
+        """
+        Initialize retention manager
+
+        Args:
+            vector_db_id: Llama Stack vector DB ID (Milvus collection name
+                          is the same with '-' replaced by '_')
+            ledger_path: JSON ledger (env RETENTION_LEDGER_PATH, required). It
+                         also seeds the collector's already-ingested IDs, so it
+                         must be on a persistent volume: on an ephemeral path
+                         every restart re-ingests every document
+            default_max_age_hours: Max age for namespaces without an override
+                                   (env RETENTION_MAX_AGE_HOURS, default 24)
+            namespace_max_age_hours: Per-namespace overrides
+                                     (env RETENTION_NAMESPACE_MAX_AGE_HOURS="ns=hours,...")
+            interval_minutes: Minimum time between retention runs
+                              (env RETENTION_INTERVAL_MINUTES, default 60)
+            milvus_uri: Milvus URI (env MILVUS_URI)
+        """
+        self.vector_db_id = vector_db_id
+        self.collection_name = vector_db_id.replace("-", "_")
+        self.ledger_path = ledger_path or os.getenv("RETENTION_LEDGER_PATH")
+        if not self.ledger_path:
+            raise RuntimeError(
+                "RETENTION_LEDGER_PATH is not set; point it at a file on a persistent volume"
+            )
+        self.default_max_age_hours = (
+            float(os.getenv("RETENTION_MAX_AGE_HOURS", "24"))
+            if default_max_age_hours is None else default_max_age_hours
+        )
+        self.namespace_max_age_hours = namespace_max_age_hours or parse_namespace_ages(
+            os.getenv("RETENTION_NAMESPACE_MAX_AGE_HOURS", "")
+        )
+        self.interval_minutes = (
+            float(os.getenv("RETENTION_INTERVAL_MINUTES", "60"))
+            if interval_minutes is None else interval_minutes
+        )
+        self.milvus_uri = milvus_uri or os.getenv("MILVUS_URI")
+        self.document_id_field = os.getenv("MILVUS_DOCUMENT_ID_FIELD", DEFAULT_DOCUMENT_ID_FIELD)
+
+        self._client = None
+        self.last_run = 0.0
+        self.documents: Dict[str, Dict[str, Any]] = self._load_ledger()
+
+    # ------------------------------------------------------------------
+    # Ledger
+    # ------------------------------------------------------------------
+
+    def _load_ledger(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.ledger_path):
+            return {}
+        try:
+            with open(self.ledger_path) as f:
+                return json.load(f).get("documents", {})
+        except Exception as e:
+            print(f"⚠️  Could not read retention ledger {self.ledger_path}: {e}")
+            return {}
+
+    def save(self):
+        """Write the ledger atomically"""
+        tmp_path = f"{self.ledger_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"vector_db_id": self.vector_db_id, "documents": self.documents}, f)
+        os.replace(tmp_path, self.ledger_path)
+
+    def document_ids(self) -> List[str]:
+        return list(self.documents)
+
+    def touch(self, documents: Iterable[Tuple[str, Optional[str]]], now: Optional[float] = None):
+        """
+        Mark documents as seen in this cycle
+
+        Args:
+            documents: (document_id, namespace) pairs
+            now: POSIX time (default: current time)
+        """
+        now = now or time.time()
+        for doc_id, namespace in documents:
+            entry = self.documents.setdefault(doc_id, {"namespace": namespace})
+            entry["last_seen"] = now
+        self.save()
+
+    def max_age_seconds(self, namespace: Optional[str]) -> float:
+        return self.namespace_max_age_hours.get(namespace, self.default_max_age_hours) * 3600
+
+    def expired(self, now: Optional[float] = None) -> List[str]:
+        """Document IDs not seen for longer than their namespace's max age"""
+        now = now or time.time()
+        return [
+            doc_id for doc_id, entry in self.documents.items()
+            if now - entry.get("last_seen", 0) > self.max_age_seconds(entry.get("namespace"))
+        ]
+
+    # ------------------------------------------------------------------
+    # Milvus
+    # ------------------------------------------------------------------
+
+    def _milvus(self):
+        """Lazily connect to Milvus (pymilvus is only needed for retention)"""
+        if self._client is None:
+            if not self.milvus_uri:
+                raise RuntimeError("MILVUS_URI is not set; cannot apply retention")
+            from pymilvus import MilvusClient
+            self._client = MilvusClient(uri=self.milvus_uri)
+        return self._client
+
+    def row_count(self) -> Optional[int]:
+        """Current number of rows (chunks) in the collection"""
+        try:
+            stats = self._milvus().get_collection_stats(collection_name=self.collection_name)
+            return int(stats.get("row_count", 0))
+        except Exception as e:
+            print(f"⚠️  Could not read row count for {self.collection_name}: {e}")
+            return None
+
+    def delete_documents(self, doc_ids: List[str]) -> List[str]:
+        """
+        Delete all chunks of the given documents
+
+        Returns:
+            Document IDs that were deleted
+        """
+        client = self._milvus()
+        deleted = []
+        for start in range(0, len(doc_ids), DELETE_BATCH_SIZE):
+            batch = doc_ids[start:start + DELETE_BATCH_SIZE]
+            try:
+                client.delete(
+                    collection_name=self.collection_name,
+                    filter=f"{self.document_id_field} in {json.dumps(batch)}"
+                )
+                deleted.extend(batch)
+            except Exception as e:
+                print(f"❌ Failed to delete {len(batch)} documents: {e}")
+        return deleted
+
+    def compact(self) -> Optional[int]:
+        """Start a Milvus compaction (reclaims space from deleted rows)"""
+        try:
+            return self._milvus().compact(collection_name=self.collection_name)
+        except Exception as e:
+            print(f"⚠️  Compaction failed for {self.collection_name}: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def due(self, now: Optional[float] = None) -> bool:
+        """Whether interval_minutes have passed since the last run"""
+        now = now or time.time()
+        return now - self.last_run >= self.interval_minutes * 60
+
+    def run(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Delete expired documents, compact, and report collection size
+
+        Returns:
+            Report with expired / deleted counts and row counts before and after
+        """
+        now = now or time.time()
+        self.last_run = now
+        expired = self.expired(now)
+
+        print(f"\n🧹 Retention: {len(expired)} of {len(self.documents)} documents expired "
+              f"in {self.collection_name}")
+
+        report = {
+            "expired": len(expired),
+            "deleted": 0,
+            "row_count_before": self.row_count(),
+            "row_count_after": None,
+            "compaction_id": None
+        }
+
+        if expired:
+            deleted = self.delete_documents(expired)
+            for doc_id in deleted:
+                self.documents.pop(doc_id, None)
+            self.save()
+            report["deleted"] = len(deleted)
+
+        report["compaction_id"] = self.compact()
+        report["row_count_after"] = self.row_count()
+
+        print(f"✅ Retention: deleted {report['deleted']} documents, "
+              f"rows {report['row_count_before']} → {report['row_count_after']}")
+        return report
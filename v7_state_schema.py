@@ -28,6 +28,7 @@ class GraphState(TypedDict):
         retrieved_docs: Documents retrieved by hybrid retrieval
         reranked_docs: Documents after reranking
         relevance_scores: Scores for each document
+        grade_cache: Relevance grades by document hash, reused across iterations
         
         # Generation
         generation: LLM-generated answer
@@ -40,6 +41,7 @@ class GraphState(TypedDict):
         # Metadata
         timestamp: When the analysis started
         data_source: Source of data (MCP or oc commands)
+        analysis_metadata: Per-run counters (cache hits/misses, skipped calls)
     """
     # Input
     question: str
@@ -56,6 +58,7 @@ class GraphState(TypedDict):
     retrieved_docs: List[Dict[str, Any]]
     reranked_docs: List[Dict[str, Any]]
     relevance_scores: List[float]
+    grade_cache: Dict[str, float]
     
     # Generation
     generation: str
@@ -68,6 +71,7 @@ class GraphState(TypedDict):
     # Metadata
     timestamp: str
     data_source: str
+    analysis_metadata: Dict[str, Any]
 
 
 class LogDocument(TypedDict):
@@ -69,7 +69,8 @@ class KubernetesDataCollector:
     
     def get_pod_logs(self, pod_name: str, namespace: str, tail_lines: int = 50):
         try:
-            result = subprocess.run(['oc', 'logs', pod_name, '-n', namespace, f'--tail={tail_lines}'], 
+            # --timestamps: the graph's time_window filter needs a timestamp on every line
+            result = subprocess.run(['oc', 'logs', pod_name, '-n', namespace, f'--tail={tail_lines}', '--timestamps'], 
                                   capture_output=True, text=True, timeout=30)
             if result.returncode == 0:
                 return result.stdout
@@ -68,7 +68,8 @@ class KubernetesDataCollector:
     
     def get_pod_logs(self, pod_name: str, namespace: str, tail_lines: int = 100):
         try:
-            result = subprocess.run(['oc', 'logs', pod_name, '-n', namespace, f'--tail={tail_lines}'], 
+            # --timestamps: the graph's time_window filter needs a timestamp on every line
+            result = subprocess.run(['oc', 'logs', pod_name, '-n', namespace, f'--tail={tail_lines}', '--timestamps'], 
                                   capture_output=True, text=True, timeout=30)
             if result.returncode == 0:
                 return result.stdout
@@ -496,6 +497,18 @@ if prompt := st.chat_input("Ask about your pods, logs, or cluster issues..."):
                         "iterations": result.get("iterations", 1),
                         "docs_retrieved": result.get("metadata", {}).get("num_docs_retrieved", 0),
                         "docs_reranked": result.get("metadata", {}).get("num_docs_relevant", 0),
+                        "retrieval_cache_hits": result.get("metadata", {}).get("retrieval_cache_hits", 0),
+                        "retrieval_cache_misses": result.get("metadata", {}).get("retrieval_cache_misses", 0),
+                        "rerank_cache_hits": result.get("metadata", {}).get("rerank_cache_hits", 0),
+                        "rerank_cache_misses": result.get("metadata", {}).get("rerank_cache_misses", 0),
+                        "rerank_skips": len(result.get("metadata", {}).get("rerank_skips", [])),
+                        "grading_llm_calls": result.get("metadata", {}).get("grading_llm_calls", 0),
+                        "grading_llm_calls_skipped": (
+                            result.get("metadata", {}).get("grading_auto_accepted", 0)
+                            + result.get("metadata", {}).get("grading_auto_rejected", 0)
+                            + result.get("metadata", {}).get("grade_cache_hits", 0)
+                            + result.get("metadata", {}).get("grading_early_exit_skips", 0)
+                        ),
                         "timestamp": result.get("timestamp", datetime.now().isoformat())
                     }
                     